@@ -120,12 +120,11 @@ def match_internships(applicant_id: str):
     Match applicant with internships → return top 5 internships
     """
     # Get applicant’s embedding from DB
-    results = applicant_db.get(ids=[applicant_id])
-    if not results["documents"]:
+    results = applicant_db.get(ids=[applicant_id], include=["embeddings"])
+    if not results["ids"]:
         return {"error": "Applicant not found"}
 
-    applicant_text = results["documents"][0]
-    query_embedding = embeddings.embed_query(applicant_text)
+    query_embedding = list(results["embeddings"][0])
 
     # Search internships
     matches = internship_db.similarity_search_by_vector(query_embedding, k=5)
@@ -138,12 +137,11 @@ def match_applicants(internship_id: str):
     Admin retrieves top 4 applicants for given internship
     """
     # Get internship’s embedding
-    results = internship_db.get(ids=[internship_id])
-    if not results["documents"]:
+    results = internship_db.get(ids=[internship_id], include=["embeddings"])
+    if not results["ids"]:
         return {"error": "Internship not found"}
 
-    internship_text = results["documents"][0]
-    query_embedding = embeddings.embed_query(internship_text)
+    query_embedding = list(results["embeddings"][0])
 
     # Search applicants
     matches = applicant_db.similarity_search_by_vector(query_embedding, k=4)
@@ -124,12 +124,12 @@ def match_internships(applicant_id: str):
     """
     Match applicant with internships → return top 5 internships
     """
-    results = applicant_db.get(ids=[applicant_id])
-    if not results["documents"]:
+    # Reuse the stored vector instead of re-embedding the stored text
+    results = applicant_db.get(ids=[applicant_id], include=["embeddings"])
+    if not results["ids"]:
         return {"error": "Applicant not found"}
 
-    applicant_text = results["documents"][0]
-    query_embedding = embedder.encode(applicant_text)
+    query_embedding = list(results["embeddings"][0])
 
     matches = internship_db.similarity_search_by_vector(query_embedding, k=5)
     return {"applicant_id": applicant_id, "top_matches": matches}
@@ -140,12 +140,11 @@ def match_applicants(internship_id: str):
     """
     Admin retrieves top 4 applicants for given internship
     """
-    results = internship_db.get(ids=[internship_id])
-    if not results["documents"]:
+    results = internship_db.get(ids=[internship_id], include=["embeddings"])
+    if not results["ids"]:
         return {"error": "Internship not found"}
 
-    internship_text = results["documents"][0]
-    query_embedding = embedder.encode(internship_text)
+    query_embedding = list(results["embeddings"][0])
 
     matches = applicant_db.similarity_search_by_vector(query_embedding, k=4)
     return {"internship_id": internship_id, "top_applicants": matches}
@@ -1,4 +1,5 @@
 import os
+import sys
 import certifi
 os.environ['SSL_CERT_FILE'] = certifi.where()
 from fastapi import FastAPI
@@ -10,12 +11,15 @@ from langchain_community.document_loaders import PyPDFLoader
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from langchain_groq import ChatGroq
-from sentence_transformers import SentenceTransformer
 
 from sqlalchemy import create_engine, Column, String, Integer, JSON
 from sqlalchemy.orm import declarative_base, sessionmaker
 from pgvector.sqlalchemy import Vector
 
+# Same model, runtime (EMBEDDING_RUNTIME) and dimension as the main backend
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sih_backend"))
+from embeddings import EMBEDDING_DIM, load_model
+
 # ----------- Load Env Vars ----------
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -26,10 +30,15 @@ from sqlalchemy.orm import sessionmaker
 import os
 
 
-# Force SSL for Neon
+# Force SSL for Neon; same pool settings as sih_backend/database.py
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"sslmode": "require"}
+    connect_args={"sslmode": "require"},
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "5")),
+    pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "300")),
+    pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "1") == "1"
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -55,12 +64,10 @@ class ResumeInput(BaseModel):
 
 # ----------- Initialize LLM + Embeddings -----------
 llm = ChatGroq(api_key=GROQ_API_KEY, model_name="Gemma2-9b-It")
-embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+embedder = load_model()
 
 # ----------- DB Setup (SQLAlchemy + Neon + pgvector) -----------
 Base = declarative_base()
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine)
 
 class Internship(Base):
     __tablename__ = "internships"
@@ -68,13 +75,13 @@ class Internship(Base):
     title = Column(String)
     description = Column(String)
     skills = Column(JSON)
-    embedding = Column(Vector(384))  # all-MiniLM-L6-v2 → 384 dimensions
+    embedding = Column(Vector(EMBEDDING_DIM))  # EMBEDDING_MODEL's dimension, 384 for all-MiniLM-L6-v2
 
 class Applicant(Base):
     __tablename__ = "applicants"
     id = Column(String, primary_key=True, index=True)
     skills = Column(JSON)
-    embedding = Column(Vector(384))
+    embedding = Column(Vector(EMBEDDING_DIM))
 
 Base.metadata.create_all(bind=engine)
 
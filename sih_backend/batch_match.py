@@ -0,0 +1,168 @@
+import json
+import os
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import schemas
+import search_backends
+from crud import embedder
+from embedding_migration import versions
+from embeddings import MODEL_NAME
+
+BATCH_MATCH_MAX_CANDIDATES = int(os.getenv("BATCH_MATCH_MAX_CANDIDATES", "10000"))
+BATCH_MATCH_MAX_LIMIT = int(os.getenv("BATCH_MATCH_MAX_LIMIT", "100"))
+# Candidates embedded and scored together; one NDJSON chunk is flushed per block
+BATCH_MATCH_BLOCK_ROWS = int(os.getenv("BATCH_MATCH_BLOCK_ROWS", "256"))
+# Internships per matrix multiply; caps the score block at BLOCK_ROWS x BLOCK_COLS floats
+BATCH_MATCH_BLOCK_COLS = int(os.getenv("BATCH_MATCH_BLOCK_COLS", "16384"))
+
+RESULT_FIELDS = ["id", "internship_title", "company_name", "location", "stipend_min", "stipend_max"]
+APPLICANT_FIELDS = ["id", "name", "email", "skills", "preferred_location"]
+
+# (identifying fields of the output line, skills or None when there is nothing to match,
+#  stored embedding or None when the skills still have to be encoded)
+MatchItem = Tuple[dict, Optional[List[str]], Optional[np.ndarray]]
+
+class EmbeddingMatrix:
+    """Embedded rows as one normalized float32 matrix, row i described by fields[i]."""
+
+    def __init__(self, vectors: np.ndarray, fields: List[dict]):
+        self.vectors = vectors
+        self.fields = fields
+
+    @classmethod
+    def from_rows(cls, rows, field_names: List[str]):
+        if not rows:
+            return cls(np.empty((0, 0), dtype=np.float32), [])
+        vectors = search_backends.normalize_vectors(np.array([np.asarray(r.embedding, dtype=np.float32) for r in rows]))
+        return cls(vectors, [{f: getattr(r, f) for f in field_names} for r in rows])
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+class InternshipMatrix(EmbeddingMatrix):
+    @classmethod
+    def load(cls, db: Session, internship_ids: Optional[List[int]] = None) -> "InternshipMatrix":
+        if internship_ids is None:
+            rows = db.execute(search_backends.internship_rows_query("")).fetchall()
+        else:
+            rows = db.execute(
+                search_backends.internship_rows_query("AND id = ANY(:ids)"), {"ids": list(internship_ids)}
+            ).fetchall()
+        return cls.from_rows(rows, RESULT_FIELDS)
+
+class CandidateMatrix(EmbeddingMatrix):
+    @classmethod
+    def load(cls, db: Session) -> "CandidateMatrix":
+        column = versions.column("candidates")
+        rows = db.execute(text(f"""
+            SELECT {", ".join(APPLICANT_FIELDS)}, {column} AS embedding
+            FROM candidates WHERE {column} IS NOT NULL ORDER BY id
+        """).columns(embedding=Vector())).fetchall()
+        return cls.from_rows(rows, APPLICANT_FIELDS)
+
+def top_k_blocked(queries: np.ndarray, matrix: np.ndarray, k: int, block_cols: int = BATCH_MATCH_BLOCK_COLS) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and scores of the k best matrix rows for each query, best first.
+
+    The matrix is multiplied in column blocks and a running top-k is kept, so
+    memory stays at len(queries) x (k + block_cols) however many internships there are.
+    """
+    k = min(k, len(matrix))
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    best_idx = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(matrix), block_cols):
+        scores = queries @ matrix[start:start + block_cols].T
+        idx = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        best_idx = np.concatenate([best_idx, idx], axis=1)
+        if best_scores.shape[1] > k:
+            keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+            best_idx = np.take_along_axis(best_idx, keep, axis=1)
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+def load_items(db: Session, request: schemas.BatchMatchRequest) -> List[MatchItem]:
+    """Candidates by id (using their stored embedding, or their extracted skills) followed by the raw skill lists, in request order."""
+    by_id = {}
+    if request.candidate_ids:
+        column = versions.column("candidates")
+        rows = db.execute(text(f"""
+            SELECT id, skills, {column} AS embedding, {column}_model AS embedding_model
+            FROM candidates WHERE id = ANY(:ids)
+        """).columns(embedding=Vector()), {"ids": list(request.candidate_ids)}).all()
+        by_id = {row.id: row for row in rows}
+
+    items = []
+    for candidate_id in request.candidate_ids:
+        row = by_id.get(candidate_id)
+        if row is None:
+            items.append(({"candidate_id": candidate_id, "error": "candidate not found"}, None, None))
+        elif not row.skills:
+            items.append(({"candidate_id": candidate_id, "error": "no skills extracted yet"}, None, None))
+        else:
+            # Vectors from another model are not comparable with the internship matrix
+            stored = row.embedding if row.embedding is not None and row.embedding_model == MODEL_NAME else None
+            items.append(({"candidate_id": candidate_id}, row.skills, stored))
+    for index, skills in enumerate(request.skills):
+        items.append(({"index": index}, skills or None, None))
+    return items
+
+def stream_matches(items: List[MatchItem], internships: InternshipMatrix, limit: int = 5,
+                   block_rows: int = BATCH_MATCH_BLOCK_ROWS) -> Iterator[str]:
+    """One NDJSON line per item, in order: its identifying fields plus `matches`.
+
+    Stored candidate embeddings are used as they are; the skills of the rest
+    of each block are embedded in one batch. The block is then scored against
+    all internships with a single blocked matrix multiply.
+    """
+    for start in range(0, len(items), block_rows):
+        block = items[start:start + block_rows]
+        matchable = [i for i, (_, skills, _) in enumerate(block) if skills]
+        matches = {i: [] for i in range(len(block))}
+
+        if matchable and len(internships):
+            vectors = {i: np.asarray(block[i][2], dtype=np.float32) for i in matchable if block[i][2] is not None}
+            to_encode = [i for i in matchable if i not in vectors]
+            if to_encode:
+                encoded = embedder.encode([" ".join(block[i][1]) for i in to_encode])
+                vectors.update(zip(to_encode, np.asarray(encoded, dtype=np.float32)))
+            queries = search_backends.normalize_vectors(np.stack([vectors[i] for i in matchable]))
+            top_idx, top_scores = top_k_blocked(queries, internships.vectors, limit)
+            for row, i in enumerate(matchable):
+                matches[i] = [
+                    {**internships.fields[j], "similarity": float(score)}
+                    for j, score in zip(top_idx[row], top_scores[row])
+                ]
+
+        yield "".join(
+            json.dumps({**key, "matches": matches[i]}) + "\n"
+            for i, (key, _, _) in enumerate(block)
+        )
+
+def stream_applicants(postings: InternshipMatrix, candidates: CandidateMatrix, limit: int = 5,
+                      block_rows: int = BATCH_MATCH_BLOCK_ROWS) -> Iterator[str]:
+    """One NDJSON line per posting with its top `limit` applicants, scored in blocks of postings."""
+    for start in range(0, len(postings), block_rows):
+        block = postings.fields[start:start + block_rows]
+        if len(candidates):
+            top_idx, top_scores = top_k_blocked(postings.vectors[start:start + block_rows], candidates.vectors, limit)
+        else:
+            top_idx = top_scores = [[] for _ in block]
+
+        yield "".join(
+            json.dumps({
+                "internship_id": posting["id"],
+                "internship_title": posting["internship_title"],
+                "applicants": [
+                    {**candidates.fields[j], "similarity": float(score)}
+                    for j, score in zip(top_idx[row], top_scores[row])
+                ],
+            }) + "\n"
+            for row, posting in enumerate(block)
+        )
@@ -0,0 +1,89 @@
+"""Compare embedding runtimes: load time, throughput, single-text latency and RSS.
+
+Each runtime runs in its own process so RSS is not shared between them:
+
+    python bench_embeddings.py
+    python bench_embeddings.py --runtimes torch onnx-int8 --texts 5000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from embeddings import ONNX_MODEL_FILES
+
+RUNTIMES = ["torch"] + list(ONNX_MODEL_FILES)
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "internship.csv")
+
+def _rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _texts(count: int):
+    if os.path.exists(CSV_PATH):
+        import pandas as pd
+        df = pd.read_csv(CSV_PATH, usecols=["internship_title", "company_name"]).dropna()
+        texts = (df["internship_title"] + " " + df["company_name"]).tolist()
+    else:
+        texts = [f"Software Engineering Intern Company {i}" for i in range(count)]
+    return (texts * (count // max(len(texts), 1) + 1))[:count]
+
+def bench(runtime: str, count: int, batch_size: int, latency_runs: int) -> dict:
+    from embeddings import load_model
+
+    texts = _texts(count)
+
+    started = time.perf_counter()
+    model = load_model(runtime)
+    model.encode(texts[:batch_size], batch_size=batch_size, convert_to_numpy=True)
+    load_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    throughput = count / (time.perf_counter() - started)
+
+    latencies = []
+    for text in texts[:latency_runs]:
+        started = time.perf_counter()
+        model.encode([text], convert_to_numpy=True)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "runtime": runtime,
+        "load_s": round(load_s, 2),
+        "texts_per_s": round(throughput, 1),
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 2),
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 2),
+        "rss_mb": round(_rss_mb(), 1),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the embedding runtimes.")
+    parser.add_argument("--runtimes", nargs="*", choices=RUNTIMES, default=RUNTIMES)
+    parser.add_argument("--texts", type=int, default=2000, help="Texts encoded for the throughput run.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency-runs", type=int, default=200, help="Single-text encodes for the latency percentiles.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(bench(args.runtimes[0], args.texts, args.batch_size, args.latency_runs)))
+        sys.exit(0)
+
+    print(f"{'runtime':<10} {'load s':>7} {'texts/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'RSS MB':>7}")
+    for runtime in args.runtimes:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", "--runtimes", runtime, "--texts", str(args.texts),
+             "--batch-size", str(args.batch_size), "--latency-runs", str(args.latency_runs)],
+            capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            print(f"❌ {runtime} failed: {out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode}")
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{r['runtime']:<10} {r['load_s']:>7} {r['texts_per_s']:>9} {r['latency_ms_p50']:>7} {r['latency_ms_p95']:>7} {r['rss_mb']:>7}")
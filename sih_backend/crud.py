@@ -1,31 +1,60 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-import numpy as np
-from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+import embedding_host
+import embedding_migration
 import models
 import schemas
-from sentence_transformers import SentenceTransformer
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
+import recommendations
+import reranker
+import search_backends
+import skill_extractor
+import vector_index
+from embeddings import MODEL_NAME, CachedEmbedder, EmbeddingBatcher, LazyModel, internship_text, load_model, model_id
+from extraction_cache import extraction_cache
+from response_cache import INTERNSHIPS, response_cache
+from offload import embed_executor, upload_executor, run_in
+import pdf_text
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional, Tuple, Union
+import functools
 import os
+import threading
+import time
 
-embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+# Nothing heavy is loaded at import; see warmup.py. With EMBEDDING_HOST_SOCKET
+# the model lives in embedding_host.py and this process only holds a client.
+embedding_model = LazyModel(embedding_host.connect if embedding_host.EMBEDDING_HOST_SOCKET else load_model)
+embedding_batcher = EmbeddingBatcher(embedding_model)
+embedder = CachedEmbedder(embedding_batcher, model_id())
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-llm = ChatGroq(api_key=GROQ_API_KEY, model_name="Gemma2-9b-It")
+LLM_MODEL_NAME = "Gemma2-9b-It"
+_llm = None
+_llm_lock = threading.Lock()
+
+def get_llm():
+    """The shared ChatGroq client, created (and langchain imported) on first use."""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from langchain_groq import ChatGroq
+                _llm = ChatGroq(api_key=GROQ_API_KEY, model_name=LLM_MODEL_NAME)
+    return _llm
+
+# Part of the extraction cache key: results from a different extractor setup are never reused
+EXTRACTION_VERSION = f"{skill_extractor.EXTRACTOR_VERSION}:{skill_extractor.SKILL_EXTRACTOR_TIERS}:{LLM_MODEL_NAME}:{model_id()}"
 
 class SkillsOutput(BaseModel):
     skills: List[str]
 
-def extract_skills_from_resume(file_path: str) -> List[str]:
-    loader = PyPDFLoader(file_path)
-    docs = loader.load()
-    resume_text = docs[0].page_content.replace("\n", " ")
+def load_resume_text(source: Union[str, bytes]) -> str:
+    """Text of all resume pages (within the pdf_text budget), from a path or the uploaded bytes."""
+    return pdf_text.extract_text(source)
+
+def _skills_chain():
+    from langchain.prompts import ChatPromptTemplate
 
-    parser = PydanticOutputParser(pydantic_object=SkillsOutput)
     prompt = ChatPromptTemplate.from_template(
         """
         You are an expert HR assistant. Extract ONLY the technical and professional skills
@@ -35,66 +64,279 @@ def extract_skills_from_resume(file_path: str) -> List[str]:
         {resume_text}
         """
     )
-    chain = prompt | llm.with_structured_output(SkillsOutput)
-    skills_out = chain.invoke({"resume_text": resume_text})
+    return prompt | get_llm().with_structured_output(SkillsOutput)
+
+def extract_skills(resume_text: str) -> List[str]:
+    skills_out = _skills_chain().invoke({"resume_text": resume_text})
     return skills_out.skills
 
 def create_internship(db: Session, internship: schemas.InternshipCreate):
-    text_for_embedding = internship.internship_title + " " + internship.company_name
-    embedding = embedder.encode([text_for_embedding], convert_to_numpy=True)[0]
+    # Skills are filled in later by internship_backfill.py, which re-embeds the row
+    text_for_embedding = internship_text(internship.internship_title, internship.company_name)
+    embedding = embedder.encode_one(text_for_embedding)
     
-    db_internship = models.Internship(
-        **internship.dict(),
-        embedding=embedding
-    )
+    db_internship = models.Internship(**internship.dict())
     db.add(db_internship)
+    db.flush()
+    # Into this process's model's column, also during a model migration
+    db.execute(
+        text(f"UPDATE internships SET {embedding_migration.versions.assignments('internships')} WHERE id = :id"),
+        {"id": db_internship.id, "embedding": vector_index.vector_param(embedding), "model": MODEL_NAME}
+    )
     db.commit()
     db.refresh(db_internship)
+    if search_backends.numpy_index is not None:
+        search_backends.numpy_index.add(db_internship.id, embedding, internship.dict())
+    recommendations.add_internship(db, db_internship.id)
+    db.commit()
+    response_cache.bump(INTERNSHIPS)
     return db_internship
 
 def get_internships(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Internship).offset(skip).limit(limit).all()
 
-def search_internships(db: Session, candidate_skills: schemas.CandidateSkills, limit: int = 5):
-    candidate_text = " ".join(candidate_skills.skills)
-    candidate_embedding = embedder.encode([candidate_text], convert_to_numpy=True)[0]
-    
-    cand_emb_str = "[" + ",".join([str(x) for x in candidate_embedding]) + "]"
+# Fuse the vector search with a full-text search over title, company and skills
+SEARCH_HYBRID = os.getenv("SEARCH_HYBRID", "1") == "1"
+# Rows each stage contributes before fusion
+HYBRID_SEARCH_DEPTH = int(os.getenv("HYBRID_SEARCH_DEPTH", "50"))
+# Reciprocal rank fusion constant: score = sum over stages of 1 / (k + rank)
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+# Each filter maps to an indexed predicate (see database.SCHEMA_UPGRADES)
+SEARCH_FILTERS = {
+    "location": "lower(location) = lower(:location)",
+    "is_remote": "is_remote = :is_remote",
+    "min_stipend": "stipend_max >= :min_stipend",
+    "min_duration": "duration_months >= :min_duration",
+    "max_duration": "duration_months <= :max_duration",
+}
+
+def _active_filters(filters: Optional[schemas.SearchFilters] = None) -> Tuple[str, ...]:
+    if filters is None:
+        return ()
+    return tuple(name for name in SEARCH_FILTERS if getattr(filters, name) is not None)
+
+def _filter_conditions(active: Tuple[str, ...], column: str = "embedding") -> List[str]:
+    return [f"{column} IS NOT NULL"] + [SEARCH_FILTERS[name] for name in active]
 
-    query = text("""
+# Statements are built once per filter combination and their SQL never varies
+# with the request otherwise, so each one is parsed and planned once per
+# connection and then runs as a prepared statement (see database.py)
+@functools.lru_cache(maxsize=None)
+def _search_query(active: Tuple[str, ...] = (), column: str = "embedding"):
+    conditions = _filter_conditions(active, column)
+
+    # The outer ORDER BY restores exact order after a relaxed iterative index scan
+    return text(f"""
+        WITH nearest AS MATERIALIZED (
+            SELECT id, internship_title, company_name, location, stipend_min, stipend_max,
+                   {column} <=> CAST(:cand_emb AS vector) AS distance
+            FROM internships
+            WHERE {" AND ".join(conditions)}
+            ORDER BY distance
+            LIMIT :limit
+        )
         SELECT id, internship_title, company_name, location, stipend_min, stipend_max,
-               1 - (embedding <=> :cand_emb) AS similarity
-        FROM internships
-        WHERE embedding IS NOT NULL
-        ORDER BY embedding <=> :cand_emb
-        LIMIT :limit;
+               1 - distance AS similarity
+        FROM nearest
+        ORDER BY distance;
     """)
-    
-    results = db.execute(query, {"cand_emb": cand_emb_str, "limit": limit}).fetchall()
+
+@functools.lru_cache(maxsize=None)
+def _hybrid_search_query(active: Tuple[str, ...] = (), column: str = "embedding"):
+    """Reciprocal rank fusion of an ANN vector stage and a GIN full-text stage.
+
+    Each stage returns at most :depth ids from its own index; only the fused
+    top :limit rows are joined back to internships.
+    """
+    conditions = " AND ".join(_filter_conditions(active, column))
+    # Each skill is matched as a phrase ("power bi"); any skill may match
+    return text(f"""
+        WITH semantic AS MATERIALIZED (
+            SELECT id, row_number() OVER (ORDER BY distance) AS rank
+            FROM (
+                SELECT id, {column} <=> CAST(:cand_emb AS vector) AS distance
+                FROM internships
+                WHERE {conditions}
+                ORDER BY distance
+                LIMIT :depth
+            ) nearest
+        ),
+        lexical AS MATERIALIZED (
+            SELECT id, row_number() OVER (ORDER BY ts_rank_cd(search_tsv, q.query) DESC, id) AS rank
+            FROM internships, (
+                SELECT CAST(string_agg('(' || phrase::text || ')', ' | ') AS tsquery) AS query
+                FROM (
+                    SELECT phraseto_tsquery('simple', skill) AS phrase
+                    FROM unnest(CAST(:skills AS text[])) AS skill
+                ) phrases
+                WHERE phrase::text <> ''
+            ) q
+            WHERE search_tsv @@ q.query AND {conditions}
+            ORDER BY rank
+            LIMIT :depth
+        ),
+        fused AS (
+            SELECT id, sum(1.0 / (:rrf_k + rank)) AS score
+            FROM (SELECT id, rank FROM semantic UNION ALL SELECT id, rank FROM lexical) ranks
+            GROUP BY id
+            ORDER BY score DESC, id
+            LIMIT :limit
+        )
+        SELECT i.id, i.internship_title, i.company_name, i.location, i.stipend_min, i.stipend_max,
+               1 - (i.{column} <=> CAST(:cand_emb AS vector)) AS similarity,
+               f.score
+        FROM fused f
+        JOIN internships i ON i.id = f.id
+        ORDER BY f.score DESC, i.id;
+    """)
+
+def _search_params(candidate_embedding, limit: int, filters: Optional[schemas.SearchFilters] = None, binary: bool = False):
+    params = {"cand_emb": vector_index.vector_param(candidate_embedding, binary), "limit": limit}
+    if filters is not None:
+        params.update({name: value for name, value in filters.model_dump().items() if value is not None})
+    return params
+
+def _search_statement(skills: List[str], candidate_embedding, limit: int,
+                      filters: Optional[schemas.SearchFilters], hybrid: Optional[bool], binary: bool = False):
+    params = _search_params(candidate_embedding, limit, filters, binary)
+    # The vectors of this process's embedding model, also during a model migration
+    column = embedding_migration.versions.column("internships")
+    skills = [skill for skill in skills if skill.strip()]
+    if not (SEARCH_HYBRID if hybrid is None else hybrid) or not skills:
+        return _search_query(_active_filters(filters), column), params
+
+    params.update({"skills": skills, "depth": max(HYBRID_SEARCH_DEPTH, limit), "rrf_k": HYBRID_RRF_K})
+    return _hybrid_search_query(_active_filters(filters), column), params
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+def _rerank_plan(limit: int, rerank: Optional[bool]) -> Tuple[bool, int]:
+    """Whether to rerank, and how many first-stage rows to fetch."""
+    use_rerank = reranker.RERANK_ENABLED if rerank is None else rerank
+    return use_rerank, max(limit, reranker.RERANK_DEPTH) if use_rerank else limit
+
+async def search_internships_async(db: AsyncSession, candidate_skills: schemas.CandidateSkills, limit: int = 5,
+                                   filters: Optional[schemas.SearchFilters] = None,
+                                   ef_search: Optional[int] = None, probes: Optional[int] = None,
+                                   hybrid: Optional[bool] = None, rerank: Optional[bool] = None,
+                                   timings: Optional[dict] = None):
+    """Top internships for a skill list; per-stage milliseconds are added to `timings` if given."""
+    timings = {} if timings is None else timings
+    use_rerank, depth = _rerank_plan(limit, rerank)
+
+    started = time.perf_counter()
+    candidate_text = " ".join(candidate_skills.skills)
+    candidate_embedding = await run_in(embed_executor, embedder.encode_one, candidate_text)
+    timings["embed"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    if search_backends.numpy_index is not None:
+        rows = await run_in(embed_executor, search_backends.numpy_index.search, candidate_embedding, depth, filters, probes)
+    else:
+        filtered = filters is not None and not filters.is_empty()
+        for statement, params in vector_index.search_settings(ef_search, probes, filtered=filtered):
+            await db.execute(statement, params)
+        query, params = _search_statement(candidate_skills.skills, candidate_embedding, depth, filters, hybrid, binary=True)
+        rows = [row._asdict() for row in (await db.execute(query, params)).fetchall()]
+    timings["retrieve"] = _elapsed_ms(started)
+
+    if use_rerank and rows:
+        started = time.perf_counter()
+        rows, timings["rerank_status"] = await reranker.reranker.rerank_async(candidate_text, rows)
+        timings["rerank"] = _elapsed_ms(started)
+    return rows[:limit]
+
+@functools.lru_cache(maxsize=None)
+def _applicants_query(column: str = "embedding"):
+    return text(f"""
+        WITH nearest AS MATERIALIZED (
+            SELECT id, name, email, skills, preferred_location,
+                   {column} <=> CAST(:cand_emb AS vector) AS distance
+            FROM candidates
+            WHERE {column} IS NOT NULL
+            ORDER BY distance
+            LIMIT :limit
+        )
+        SELECT id, name, email, skills, preferred_location, 1 - distance AS similarity
+        FROM nearest
+        ORDER BY distance;
+    """)
+
+async def search_applicants_async(db: AsyncSession, internship_id: int, limit: int = 5,
+                                  ef_search: Optional[int] = None, probes: Optional[int] = None):
+    """Top applicants for one posting through the ANN index on candidates.embedding; None if it does not exist."""
+    versions = embedding_migration.versions
+    internship = (await db.execute(versions.vector_query("internships"), {"id": internship_id})).first()
+    if internship is None:
+        return None
+    if internship.embedding is None:
+        return []
+
+    for statement, params in vector_index.search_settings(ef_search, probes):
+        await db.execute(statement, params)
+    query = _applicants_query(versions.column("candidates"))
+    results = (await db.execute(query, _search_params(internship.embedding, limit, binary=True))).fetchall()
     return [row._asdict() for row in results]
 
-def create_candidate(db: Session, candidate: schemas.CandidateCreate, resume_path: str, income_certificate_path: str):
-    db_candidate = db.query(models.Candidate).filter(models.Candidate.email == candidate.email).first()
-    
-    skills = extract_skills_from_resume(resume_path)
+async def _missing_embedding_async(db: AsyncSession, candidate_id: int) -> bool:
+    query = embedding_migration.versions.vector_query("candidates")
+    return (await db.execute(query, {"id": candidate_id})).scalar() is None
+
+async def create_candidate_async(db: AsyncSession, candidate: schemas.CandidateCreate, resume_path: str, income_certificate_path: str, resume_sha256: str):
+    """Persist the upload and queue skill extraction; see jobs.py for the worker side.
 
+    A byte-identical resume seen before is answered from the extraction cache
+    and its job is recorded as already done. Otherwise nothing is parsed here:
+    the worker reads the stored, content-addressed file.
+    """
+    result = await db.execute(select(models.Candidate).where(models.Candidate.email == candidate.email))
+    db_candidate = result.scalars().first()
+
+    cache_key = extraction_cache.key(resume_sha256, EXTRACTION_VERSION)
+    cached = await run_in(upload_executor, extraction_cache.get, cache_key)
+    skills_status = "done" if cached else "pending"
+
+    previous_skills = db_candidate.skills if db_candidate else None
     if db_candidate:
         update_data = candidate.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_candidate, key, value)
-        
-        db_candidate.skills = skills
+
         db_candidate.resume_path = resume_path
         db_candidate.income_certificate_path = income_certificate_path
+        db_candidate.skills_status = skills_status
     else:
         db_candidate = models.Candidate(
             **candidate.dict(),
-            skills=skills,
             resume_path=resume_path,
-            income_certificate_path=income_certificate_path
+            income_certificate_path=income_certificate_path,
+            skills_status=skills_status
         )
         db.add(db_candidate)
 
-    db.commit()
-    db.refresh(db_candidate)
-    return db_candidate
+    embedding = None
+    if cached:
+        db_candidate.skills = cached.skills
+        if cached.embedding is not None:
+            embedding = cached.embedding
+            embedder.prime(" ".join(cached.skills), cached.embedding)
+        else:
+            embedding = await run_in(embed_executor, embedder.encode_one, " ".join(cached.skills))
+        db_job = models.ExtractionJob(status="done", stage="cached", attempts=0, resume_sha256=resume_sha256)
+    else:
+        db_job = models.ExtractionJob(status="queued", stage="queued", attempts=0, resume_sha256=resume_sha256)
+    await db.flush()
+    db_job.candidate_id = db_candidate.id
+    db.add(db_job)
+
+    if cached and (cached.skills != previous_skills or await _missing_embedding_async(db, db_candidate.id)):
+        await recommendations.refresh_candidate_async(db, db_candidate.id, embedding)
+
+    await db.commit()
+    await db.refresh(db_candidate)
+    return db_candidate, db_job
+
+async def get_extraction_job(db: AsyncSession, job_id: int):
+    return await db.get(models.ExtractionJob, job_id)
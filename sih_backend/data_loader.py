@@ -1,18 +1,32 @@
+import argparse
 import pandas as pd
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 import os
 import re
-from datetime import datetime
-from sentence_transformers import SentenceTransformer
+import hashlib
+from psycopg2.extras import execute_values
+from pgvector.psycopg2 import register_vector
+from database import apply_one_time_upgrades, lock_schema
+from embedding_migration import versions
+from embeddings import EMBEDDING_DIM, MODEL_NAME, internship_text, load_model
+from response_cache import INTERNSHIPS, response_cache
+
+CSV_PATH = 'SIH/internship.csv'
+SAMPLE_ROWS = 200
+DEFAULT_BATCH_SIZE = 500
+
+COLUMNS = ['internship_title','company_name','location','is_remote',
+           'start_date','duration_months','stipend_min','stipend_max','stipend_avg']
+KEY_COLUMNS = ['internship_title','company_name','location','stipend_min','stipend_max']
 
 def parse_stipend(s):
-    if pd.isna(s): 
+    if pd.isna(s):
         return (0, 0)
     s = str(s).lower()
     if "unpaid" in s:
         return (0, 0)
-    
+
     nums = re.findall(r'\d[\d,]*', s)
     nums = [int(x.replace(',', '')) for x in nums]
 
@@ -23,32 +37,120 @@ def parse_stipend(s):
     else:
         return (0, 0)
 
-def load_data():
-    load_dotenv()
-    url = os.getenv('DATABASE_URL')
-    if url.startswith("postgres://"):
-        url = url.replace("postgres://", "postgresql+psycopg2://", 1)
-
-    engine = create_engine(url)
-
-    data = pd.read_csv('SIH/internship.csv')
-    df = data.head(200)
+def prepare_dataframe(data):
+    df = data.copy()
 
     df['internship_title'] = df['internship_title'].str.strip()
     df['company_name'] = df['company_name'].str.strip()
     df['location'] = df['location'].str.strip().str.title()
-    df['is_remote'] = df['location'].str.contains("work from home", case=False)
+    df['is_remote'] = df['location'].str.contains("work from home", case=False).fillna(False)
     df['location'] = df['location'].replace("Work From Home", "Remote")
-    df['duration_months'] = df['duration'].str.extract(r'(\d+)').astype(float)
+    df['duration_months'] = df['duration'].str.extract(r'(\d+)', expand=False).astype(float)
     df[['stipend_min','stipend_max']] = df['stipend'].apply(lambda x: pd.Series(parse_stipend(x)))
     df['stipend_avg'] = (df['stipend_min'] + df['stipend_max']) / 2
-    
+
     df['start_date'] = None # Set start_date to None as it is not available in the csv
 
-    df = df[['internship_title','company_name','location','is_remote',
-             'start_date','duration_months','stipend_min','stipend_max','stipend_avg']]
+    # The INT columns must reach the driver as Python ints/None, not numpy floats/NaN
+    for col in ['duration_months', 'stipend_min', 'stipend_max', 'stipend_avg']:
+        df[col] = df[col].round().astype('Int64')
+
+    df = df[COLUMNS].reset_index(drop=True)
+    df = df.astype(object).where(df.notna(), None)
+
+    df['source_key'] = [_hash_values(row) for row in df[KEY_COLUMNS].itertuples(index=False)]
+    df['content_hash'] = [_hash_values(row) for row in df[COLUMNS].itertuples(index=False)]
+    # The feed repeats postings; the last occurrence of a natural key wins
+    return df.drop_duplicates(subset='source_key', keep='last').reset_index(drop=True)
+
+def _hash_values(values):
+    joined = "\x1f".join("" if v is None else str(v) for v in values)
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+def backfill_keys(conn):
+    """Key the rows loaded before source_key existed, so the upsert updates them instead of adding copies.
+
+    Where the old loader stored a posting more than once, the newest row takes
+    the key, as the last occurrence does in prepare_dataframe. Returns the
+    number of rows keyed and the number of older copies left without a key.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT id, {', '.join(COLUMNS)} FROM internships WHERE source_key IS NULL ORDER BY id")
+        rows = cur.fetchall()
+        if not rows:
+            return 0, 0
+
+        key_positions = [COLUMNS.index(c) for c in KEY_COLUMNS]
+        keyed = {}
+        for internship_id, *values in rows:
+            keyed[_hash_values([values[i] for i in key_positions])] = (internship_id, _hash_values(values))
+        execute_values(cur, """
+            UPDATE internships i SET source_key = v.source_key, content_hash = v.content_hash
+            FROM (VALUES %s) AS v (id, source_key, content_hash)
+            WHERE i.id = v.id AND NOT EXISTS (SELECT 1 FROM internships k WHERE k.source_key = v.source_key)
+        """, [(internship_id, key, content) for key, (internship_id, content) in keyed.items()], page_size=len(keyed))
+        updated = cur.rowcount
+    conn.commit()
+    return updated, len(rows) - updated
 
-    create_table_query = """
+def split_delta(conn, df):
+    """Return the rows of `df` that are new or changed, plus the unchanged count."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT source_key, content_hash FROM internships WHERE source_key = ANY(%s)",
+            (df['source_key'].tolist(),)
+        )
+        existing = dict(cur.fetchall())
+
+    stored = df['source_key'].map(existing)
+    is_new = stored.isna()
+    is_changed = ~is_new & (stored != df['content_hash'])
+    delta = df[is_new | is_changed].reset_index(drop=True)
+    return delta, int(is_new.sum()), int(is_changed.sum()), int(len(df) - len(delta))
+
+def upsert_batches(conn, df, embedder, batch_size=DEFAULT_BATCH_SIZE):
+    """Embed and upsert `df` in batches, one multi-row INSERT per batch."""
+    # Vectors go into this model's column, also during a model migration
+    vector_column = versions.column("internships")
+    columns = COLUMNS + ['source_key', 'content_hash', f'{vector_column}_model']
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in COLUMNS + ['content_hash'])
+    updates += ", " + versions.assignments("internships", f"EXCLUDED.{vector_column}", f"EXCLUDED.{vector_column}_model")
+    # A changed posting's skills are stale; internship_backfill.py extracts them again
+    updates += ", skills = NULL"
+    insert_query = f"""
+        INSERT INTO internships ({', '.join(columns)}, {vector_column}) VALUES %s
+        ON CONFLICT (source_key) DO UPDATE SET {updates}
+    """
+
+    upserted = 0
+    with conn.cursor() as cur:
+        for start in range(0, len(df), batch_size):
+            batch = df.iloc[start:start + batch_size]
+            texts = [internship_text(title, company) for title, company in zip(batch['internship_title'], batch['company_name'])]
+            embeddings = embedder.encode(texts, batch_size=64, convert_to_numpy=True)
+
+            rows = [(*row, emb) for row, emb in zip(batch.assign(**{f'{vector_column}_model': MODEL_NAME})[columns].itertuples(index=False), embeddings)]
+            execute_values(cur, insert_query, rows, page_size=batch_size)
+            conn.commit()
+
+            upserted += len(rows)
+            print(f"   ... {upserted}/{len(df)} rows")
+    return upserted
+
+def load_data(csv_path=CSV_PATH, full=False, batch_size=DEFAULT_BATCH_SIZE):
+    load_dotenv()
+    url = os.getenv('DATABASE_URL')
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql+psycopg2://", 1)
+
+    engine = create_engine(url)
+
+    data = pd.read_csv(csv_path)
+    if not full:
+        data = data.head(SAMPLE_ROWS)
+    df = prepare_dataframe(data)
+
+    create_table_query = f"""
     CREATE TABLE IF NOT EXISTS internships (
         id SERIAL PRIMARY KEY,
         internship_title TEXT,
@@ -61,37 +163,53 @@ def load_data():
         stipend_avg INT,
         is_remote BOOLEAN,
         skills TEXT[],
-        embedding VECTOR(384)
+        embedding VECTOR({EMBEDDING_DIM}),
+        embedding_model TEXT,
+        source_key TEXT,
+        content_hash TEXT
     );
+    ALTER TABLE internships ADD COLUMN IF NOT EXISTS source_key TEXT;
+    ALTER TABLE internships ADD COLUMN IF NOT EXISTS content_hash TEXT;
+    CREATE UNIQUE INDEX IF NOT EXISTS ix_internships_source_key ON internships (source_key);
     """
     with engine.connect() as conn:
+        # API workers may be running init_db() at the same time
+        lock_schema(conn)
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
         conn.execute(text(create_table_query))
+        # Adds embedding_model and tags the vectors already stored, like the API's startup
+        apply_one_time_upgrades(conn, ["internships"])
         conn.commit()
         print("✅ Table 'internships' created successfully!")
+        # Which column this model's vectors live in; the API creates the table
+        if conn.execute(text("SELECT to_regclass('embedding_versions')")).scalar() is not None:
+            versions.refresh(conn)
 
-    df.to_sql("internships", engine, if_exists="append", index=False)
-    print("✅ Data inserted successfully!")
-
-    embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-    df['text_for_embedding'] = df['internship_title'] + " " + df['company_name']
-    embeddings = embedder.encode(df['text_for_embedding'].tolist(), convert_to_numpy=True)
-
-    with engine.begin() as conn:
-        for i, row in df.iterrows():
-            emb = embeddings[i].astype(float)
-            emb_str = "[" + ",".join([str(x) for x in emb]) + "]"
-
-            query = text('''
-                UPDATE internships
-                SET embedding = :embedding
-                WHERE internship_title = :title AND company_name = :company
-            ''')
-            conn.execute(query, {
-                "embedding": emb_str,
-                "title": row['internship_title'],
-                "company": row['company_name']
-            })
-    print("✅ Embeddings stored in DB!")
+    raw_conn = engine.raw_connection()
+    try:
+        conn = raw_conn.driver_connection
+        keyed, unkeyed = backfill_keys(conn)
+        if keyed or unkeyed:
+            print(f"✅ Keyed {keyed} rows loaded before source_key; {unkeyed} older duplicates left unkeyed")
+        delta, new, changed, unchanged = split_delta(conn, df)
+        print(f"✅ {new} new, {changed} changed, {unchanged} unchanged rows")
+        if delta.empty:
+            return
+
+        embedder = load_model()
+        register_vector(conn)
+        upserted = upsert_batches(conn, delta, embedder, batch_size=batch_size)
+    finally:
+        raw_conn.close()
+    # Only reaches API workers through a shared cache backend; otherwise their entries expire by TTL
+    response_cache.bump(INTERNSHIPS)
+    print(f"✅ {upserted} rows upserted with embeddings!")
 
 if __name__ == "__main__":
-    load_data()
+    parser = argparse.ArgumentParser(description="Load internships from CSV into the database.")
+    parser.add_argument("--csv", default=CSV_PATH, help="Path to the internship CSV file.")
+    parser.add_argument("--full", action="store_true", help=f"Load the whole CSV instead of the first {SAMPLE_ROWS} rows.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows embedded and upserted per batch.")
+    args = parser.parse_args()
+
+    load_data(csv_path=args.csv, full=args.full, batch_size=args.batch_size)
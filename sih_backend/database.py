@@ -1,8 +1,12 @@
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from dotenv import load_dotenv
+import vector_index
+from embeddings import EMBEDDING_DIM, MODEL_NAME
 
 load_dotenv()
 
@@ -11,13 +15,57 @@ url = os.getenv('DATABASE_URL')
 if url.startswith("postgres://"):
     url = url.replace("postgres://", "postgresql+psycopg2://", 1)
 
+# Each process holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections per engine
+# (sync and async), so size them against the server's connection limit
+# divided by the number of workers.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Neon closes connections when compute scales to zero; recycle before that and
+# test each checkout so a suspended endpoint never surfaces as a request error
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# Server-side prepared statements per async connection; 0 disables them, for
+# poolers in transaction mode without prepared statement support
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
 engine = create_engine(
     url,
-    connect_args={"sslmode": "require"}
+    connect_args={"sslmode": "require"},
+    **POOL_OPTIONS
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def _async_url(url):
+    # asyncpg takes ssl through connect_args and rejects libpq-only query options
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    async_url = async_url.difference_update_query(["sslmode", "channel_binding"])
+    # SQLAlchemy prepares every statement on the server and caches the handle per connection
+    return async_url.update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+
+async_engine = create_async_engine(
+    _async_url(url),
+    connect_args={"ssl": "require", "statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+    **POOL_OPTIONS
+)
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _register_vector(dbapi_connection, connection_record):
+    # Vector parameters and results travel in pgvector's binary format instead of
+    # as '[0.1,0.2,...]' text. Needs the extension, which init_db() creates first.
+    from pgvector.asyncpg import register_vector
+    dbapi_connection.run_async(register_vector)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -25,10 +73,109 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Every worker runs init_db() when it boots; concurrent DDL on the same objects
+# fails with "tuple concurrently updated" or "already exists", so schema
+# changes are serialized on this transaction-level advisory lock
+SCHEMA_LOCK_KEY = 7201
+
+def lock_schema(conn):
+    """Hold the schema lock until `conn`'s transaction ends."""
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+
+# create_all never alters existing tables, so columns added after a table
+# was first created are brought in here
+SCHEMA_UPGRADES = [
+    "ALTER TABLE internships ADD COLUMN IF NOT EXISTS source_key VARCHAR",
+    "ALTER TABLE internships ADD COLUMN IF NOT EXISTS content_hash VARCHAR",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_internships_source_key ON internships (source_key)",
+    "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS skills_status VARCHAR",
+    f"ALTER TABLE candidates ADD COLUMN IF NOT EXISTS embedding vector({EMBEDDING_DIM})",
+    "ALTER TABLE extraction_jobs ADD COLUMN IF NOT EXISTS resume_sha256 VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_extraction_jobs_resume_sha256 ON extraction_jobs (resume_sha256)",
+    "ALTER TABLE extraction_jobs ADD COLUMN IF NOT EXISTS resume_text TEXT",
+    # Indexes behind the /search/ filters
+    "CREATE INDEX IF NOT EXISTS ix_internships_location_lower ON internships (lower(location))",
+    "CREATE INDEX IF NOT EXISTS ix_internships_is_remote ON internships (is_remote)",
+    "CREATE INDEX IF NOT EXISTS ix_internships_stipend_max ON internships (stipend_max)",
+    "CREATE INDEX IF NOT EXISTS ix_internships_duration_months ON internships (duration_months)",
+    "CREATE INDEX IF NOT EXISTS ix_internships_skills ON internships USING gin (skills)",
+    # Full-text stage of hybrid search; array_to_string is only STABLE, so it is
+    # wrapped to be usable in a generated column
+    """CREATE OR REPLACE FUNCTION internship_search_text(title TEXT, company TEXT, skills TEXT[])
+       RETURNS TEXT LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+       $$ SELECT coalesce(title, '') || ' ' || coalesce(company, '') || ' ' || coalesce(array_to_string(skills, ' '), '') $$""",
+    """ALTER TABLE internships ADD COLUMN IF NOT EXISTS search_tsv tsvector
+       GENERATED ALWAYS AS (to_tsvector('simple', internship_search_text(internship_title, company_name, skills))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_internships_search_tsv ON internships USING gin (search_tsv)",
+    "ALTER TABLE internship_backfill ADD COLUMN IF NOT EXISTS embedding_model VARCHAR",
+    # Lets the NumPy index pull postings edited by other processes, whichever
+    # statement edited them
+    "ALTER TABLE internships ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_internships_updated_at ON internships (updated_at)",
+    """CREATE OR REPLACE FUNCTION touch_internship() RETURNS trigger LANGUAGE plpgsql AS $$
+       BEGIN
+           IF (NEW.embedding, NEW.internship_title, NEW.company_name, NEW.location,
+               NEW.stipend_min, NEW.stipend_max, NEW.duration_months, NEW.is_remote)
+              IS DISTINCT FROM (OLD.embedding, OLD.internship_title, OLD.company_name, OLD.location,
+               OLD.stipend_min, OLD.stipend_max, OLD.duration_months, OLD.is_remote) THEN
+               NEW.updated_at := now();
+           END IF;
+           RETURN NEW;
+       END $$""",
+    """DO $$ BEGIN
+           IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'touch_internship' AND tgrelid = 'internships'::regclass) THEN
+               CREATE TRIGGER touch_internship BEFORE UPDATE ON internships
+               FOR EACH ROW EXECUTE FUNCTION touch_internship();
+           END IF;
+       END $$""",
+]
+
+# Upgrades that must not run again once applied: each runs only while its
+# catalog check finds nothing. :model is this process's EMBEDDING_MODEL.
+# (table, check, statements)
+ONE_TIME_UPGRADES = [
+    # Per-row embedding model; vectors written before it was tracked came from
+    # the model the database was being served with, so this runs once, when
+    # the column is added, and never re-tags rows during a later migration
+    ("internships", "SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = 'internships' AND column_name = 'embedding_model'", [
+        "ALTER TABLE internships ADD COLUMN embedding_model VARCHAR",
+        "UPDATE internships SET embedding_model = :model WHERE embedding IS NOT NULL",
+    ]),
+    ("candidates", "SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = 'candidates' AND column_name = 'embedding_model'", [
+        "ALTER TABLE candidates ADD COLUMN embedding_model VARCHAR",
+        "UPDATE candidates SET embedding_model = :model WHERE embedding IS NOT NULL",
+    ]),
+    # Staged vectors without a fixed dimension survive a model migration;
+    # atttypmod is -1 once the column is a plain `vector`
+    ("internship_backfill", "SELECT 1 FROM pg_attribute WHERE attrelid = 'internship_backfill'::regclass AND attname = 'embedding' AND atttypmod = -1", [
+        "ALTER TABLE internship_backfill ALTER COLUMN embedding TYPE vector",
+    ]),
+]
+
+def apply_one_time_upgrades(conn, tables=None):
+    """Run the ONE_TIME_UPGRADES not applied yet, optionally only those for `tables`."""
+    for table, check, statements in ONE_TIME_UPGRADES:
+        if tables is not None and table not in tables:
+            continue
+        if conn.execute(text(check)).first() is None:
+            for statement in statements:
+                conn.execute(text(statement), {"model": MODEL_NAME})
+
 def init_db():
     with engine.connect() as conn:
         print(conn.execute(text("SELECT 1")).scalar())
+        lock_schema(conn)
         conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
         conn.commit()
         print("✅ pgvector extension enabled!")
-    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        lock_schema(conn)
+        Base.metadata.create_all(bind=conn)
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
+        apply_one_time_upgrades(conn)
+        vector_index.ensure_indexes(conn)
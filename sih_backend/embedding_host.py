@@ -0,0 +1,163 @@
+"""One process that owns the embedding model, shared by every API worker on the box.
+
+Run it next to the workers and point them at its socket:
+
+    python embedding_host.py                       # loads EMBEDDING_RUNTIME once
+    EMBEDDING_HOST_SOCKET=/tmp/sih-embed.sock uvicorn main:app --workers 8
+
+Protocol over the Unix socket, per request on a persistent connection:
+    -> !I payload length, then a UTF-8 JSON list of texts
+    <- !ii (rows, dim), then rows * dim float32 values in native byte order
+    <- !ii (-1, n) on failure, then an n-byte UTF-8 error message
+"""
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from embeddings import EMBEDDING_DIM, EmbeddingBatcher, load_model
+
+# Set in the workers to use the host; unset means each process loads its own model
+EMBEDDING_HOST_SOCKET = os.getenv("EMBEDDING_HOST_SOCKET")
+EMBED_HOST_TIMEOUT_SECONDS = float(os.getenv("EMBED_HOST_TIMEOUT_SECONDS", "30"))
+EMBED_HOST_MAX_REQUEST_BYTES = int(os.getenv("EMBED_HOST_MAX_REQUEST_BYTES", str(16 * 1024 * 1024)))
+DEFAULT_SOCKET = "/tmp/sih-embed.sock"
+
+_REQUEST = struct.Struct("!I")
+_RESPONSE = struct.Struct("!ii")
+
+def _recv_exact(sock: socket.socket, nbytes: int) -> Optional[bytearray]:
+    """Read exactly `nbytes` straight into one buffer; None if the peer closed before sending any."""
+    buf = bytearray(nbytes)
+    view = memoryview(buf)
+    received = 0
+    while received < nbytes:
+        n = sock.recv_into(view[received:], nbytes - received)
+        if n == 0:
+            if received == 0:
+                return None
+            raise ConnectionError("embedding host connection closed mid-message")
+        received += n
+    return buf
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            header = _recv_exact(self.request, _REQUEST.size)
+            if header is None:
+                return
+            (length,) = _REQUEST.unpack(header)
+            if length > EMBED_HOST_MAX_REQUEST_BYTES:
+                self._send_error(f"request of {length} bytes exceeds {EMBED_HOST_MAX_REQUEST_BYTES}")
+                return
+            payload = _recv_exact(self.request, length)
+            if payload is None:
+                return
+
+            try:
+                texts = json.loads(payload.decode("utf-8"))
+                vectors = self.server.model.encode(texts, convert_to_numpy=True) if texts else np.empty((0, EMBEDDING_DIM))
+                vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            except Exception as exc:
+                self._send_error(f"{type(exc).__name__}: {exc}")
+                continue
+            self.request.sendall(_RESPONSE.pack(*vectors.shape))
+            # Sent from the array's own memory, without serializing
+            self.request.sendall(memoryview(vectors).cast("B"))
+
+    def _send_error(self, message: str):
+        data = message.encode("utf-8")
+        self.request.sendall(_RESPONSE.pack(-1, len(data)) + data)
+
+class EmbeddingHostServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, model):
+        if os.path.exists(path):
+            os.remove(path)
+        # Encode requests from every worker are gathered into shared model batches
+        self.model = EmbeddingBatcher(model)
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+class EmbeddingHostClient:
+    """Same `encode` as SentenceTransformer, answered by the embedding host.
+
+    Each thread keeps one persistent connection; a broken connection is
+    re-opened once per call. Returned arrays are views over the received
+    bytes, not copies.
+    """
+
+    def __init__(self, path: str, timeout: float = EMBED_HOST_TIMEOUT_SECONDS):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _request(self, payload: bytes) -> np.ndarray:
+        sock = self._connection()
+        sock.sendall(_REQUEST.pack(len(payload)) + payload)
+        header = _recv_exact(sock, _RESPONSE.size)
+        if header is None:
+            raise ConnectionError("embedding host closed the connection")
+        rows, size = _RESPONSE.unpack(header)
+        if rows < 0:
+            raise RuntimeError(f"embedding host: {_recv_exact(sock, size).decode('utf-8')}")
+        body = _recv_exact(sock, rows * size * 4) if rows else bytearray()
+        return np.frombuffer(body, dtype=np.float32).reshape(rows, size)
+
+    def encode(self, texts: List[str], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            return self.encode([texts])[0]
+        if not texts:
+            return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+        payload = json.dumps(list(texts)).encode("utf-8")
+        try:
+            return self._request(payload)
+        except OSError:
+            # The host restarted or the connection went stale; retry once on a fresh one
+            self._drop_connection()
+            try:
+                return self._request(payload)
+            except OSError:
+                self._drop_connection()
+                raise
+
+def connect(path: Optional[str] = None) -> EmbeddingHostClient:
+    return EmbeddingHostClient(path or EMBEDDING_HOST_SOCKET)
+
+def serve(path: str = DEFAULT_SOCKET):
+    server = EmbeddingHostServer(path, load_model())
+    print(f"✅ Embedding host listening on {path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+if __name__ == "__main__":
+    serve(EMBEDDING_HOST_SOCKET or DEFAULT_SOCKET)
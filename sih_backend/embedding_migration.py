@@ -0,0 +1,353 @@
+import functools
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import text
+
+import vector_index
+from embeddings import LazyModel, MODEL_NAME, internship_text, load_model
+
+# How often each worker re-reads embedding_versions
+EMBEDDING_STATE_CHECK_SECONDS = float(os.getenv("EMBEDDING_STATE_CHECK_SECONDS", "30"))
+# Rows encoded and committed per re-embed batch
+REEMBED_BATCH_SIZE = int(os.getenv("REEMBED_BATCH_SIZE", "256"))
+# Longest the cutover waits for a table lock before giving up (and leaving everything as it was)
+EMBEDDING_CUTOVER_LOCK_TIMEOUT = os.getenv("EMBEDDING_CUTOVER_LOCK_TIMEOUT", "5s")
+
+SHADOW_COLUMN = "embedding_shadow"
+# Re-embed passes over rows written while a pass was running
+REEMBED_MAX_PASSES = 3
+
+# Columns each table's vectors are computed from, and the text built from them
+SOURCES: Dict[str, Tuple[str, Callable]] = {
+    "internships": ("internship_title, company_name, skills",
+                    lambda row: internship_text(row.internship_title, row.company_name, row.skills)),
+    "candidates": ("skills", lambda row: " ".join(row.skills or [])),
+}
+
+# A shadow vector is only valid for the active vector it was computed next to.
+# A writer on the shadow model clears `embedding` itself (see
+# EmbeddingVersions.assignments), which must not clear the vector it just wrote.
+# Columns are looked up by name when the trigger fires, so this keeps working
+# after the cutover renames them.
+CLEAR_SHADOW_FUNCTION = """
+    CREATE OR REPLACE FUNCTION clear_stale_embedding_shadow() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF NEW.embedding IS DISTINCT FROM OLD.embedding AND NEW.embedding IS NOT NULL THEN
+            NEW.embedding_shadow := NULL;
+            NEW.embedding_shadow_model := NULL;
+        END IF;
+        RETURN NEW;
+    END $$
+"""
+
+def _trigger_name(table: str) -> str:
+    return f"{table}_clear_embedding_shadow"
+
+class EmbeddingVersions:
+    """This process's cached copy of `embedding_versions`.
+
+    Decides which column holds this process's model's vectors: `embedding`
+    normally, `embedding_shadow` for a worker still on the old model after a
+    cutover (or already on the new one before it). Every vector this process
+    reads or writes goes through that column; mixing vectors from two models
+    would return meaningless scores.
+    """
+
+    def __init__(self, model: str = MODEL_NAME):
+        self.model = model
+        self._versions: Dict[str, Tuple[str, Optional[str]]] = {}
+        self.shadow_reads = 0
+        self.mismatches = 0
+
+    def refresh(self, db):
+        rows = db.execute(text("SELECT table_name, active_model, shadow_model FROM embedding_versions")).all()
+        self._versions = {row.table_name: (row.active_model, row.shadow_model) for row in rows}
+        for table, models in self._versions.items():
+            if self.model not in models:
+                print(f"❌ EMBEDDING_MODEL {self.model} matches no vectors in {table} ({', '.join(m for m in models if m)})")
+
+    def column(self, table: str) -> str:
+        active, shadow = self._versions.get(table, (self.model, None))
+        if self.model == active:
+            return "embedding"
+        if self.model == shadow:
+            self.shadow_reads += 1
+            return SHADOW_COLUMN
+        self.mismatches += 1
+        return "embedding"
+
+    def assignments(self, table: str, value: str = "CAST(:embedding AS vector)", model: str = ":model") -> str:
+        """SET list that stores `value`, a vector from this process's model, tagged with `model`.
+
+        Writing the shadow column also clears `embedding`, so old-model readers
+        skip the row until `finish` re-embeds it instead of scoring a vector
+        of content that has since changed. Writing `embedding` needs no such
+        step: the trigger clears a stale shadow.
+        """
+        column = self.column(table)
+        sql = f"{column} = {value}, {column}_model = {model}"
+        if column == SHADOW_COLUMN:
+            sql += ", embedding = NULL, embedding_model = NULL"
+        return sql
+
+    def differs(self, table: str, value: str = "CAST(:embedding AS vector)") -> str:
+        """Condition that is false when `assignments` would leave the row as it is."""
+        column = self.column(table)
+        condition = f"{column} IS DISTINCT FROM {value}"
+        if column == SHADOW_COLUMN:
+            condition = f"({condition} OR embedding IS NOT NULL)"
+        return condition
+
+    def vector_query(self, table: str):
+        """One row's vector from this process's model as `embedding` (NULL if it has none), by :id."""
+        return _vector_query(table, self.column(table))
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "tables": {table: {"active_model": active, "shadow_model": shadow} for table, (active, shadow) in self._versions.items()},
+            "shadow_reads": self.shadow_reads,
+            "mismatches": self.mismatches,
+        }
+
+@functools.lru_cache(maxsize=None)
+def _vector_query(table: str, column: str):
+    return text(f"SELECT {column} AS embedding FROM {table} WHERE id = :id").columns(embedding=Vector())
+
+versions = EmbeddingVersions()
+
+_stop_refresh = threading.Event()
+
+def start(session_factory):
+    """Read embedding_versions now and keep it current in the background."""
+    def refresh():
+        db = session_factory()
+        try:
+            versions.refresh(db)
+        except Exception as exc:
+            print(f"❌ Embedding version refresh failed: {exc}")
+        finally:
+            db.close()
+
+    refresh()
+
+    def refresh_loop():
+        while not _stop_refresh.wait(EMBEDDING_STATE_CHECK_SECONDS):
+            refresh()
+
+    _stop_refresh.clear()
+    threading.Thread(target=refresh_loop, name="embedding-versions-refresh", daemon=True).start()
+
+def stop():
+    _stop_refresh.set()
+
+def _has_shadow(conn, table: str) -> bool:
+    return conn.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column
+    """), {"table": table, "column": SHADOW_COLUMN}).first() is not None
+
+def _pending_where(model_column: str, has_shadow: bool) -> str:
+    # A row written by a worker on the other model holds only that model's vector
+    present = f"(embedding IS NOT NULL OR {SHADOW_COLUMN} IS NOT NULL)" if has_shadow else "embedding IS NOT NULL"
+    return f"{present} AND {model_column} IS DISTINCT FROM :model"
+
+def _count_pending(conn, table: str, model_column: str, model: str) -> int:
+    where = _pending_where(model_column, _has_shadow(conn, table))
+    return conn.execute(text(f"SELECT count(*) FROM {table} WHERE {where}"), {"model": model}).scalar()
+
+def _reembed(conn, table: str, vector_column: str, model_column: str, model: str, encoder,
+             batch_size: int = REEMBED_BATCH_SIZE, commit: bool = True) -> int:
+    """Write `model`'s vectors into `vector_column` for every row not yet tagged with it.
+
+    Each batch is committed, so an interrupted run resumes where it stopped.
+    A row updated between the read and the write (its xmin changed) is left
+    for the next pass. Returns the number of rows written.
+    """
+    columns, source_text = SOURCES[table]
+    select_query = text(f"""
+        SELECT id, xmin::text AS version, {columns}
+        FROM {table}
+        WHERE id > :after AND {_pending_where(model_column, _has_shadow(conn, table))}
+        ORDER BY id
+        LIMIT :limit
+    """)
+    update_query = text(f"""
+        UPDATE {table} SET {vector_column} = CAST(:embedding AS vector), {model_column} = :model
+        WHERE id = :id AND xmin::text = :version
+    """)
+
+    written = 0
+    after = 0
+    while True:
+        rows = conn.execute(select_query, {"after": after, "model": model, "limit": batch_size}).all()
+        if not rows:
+            break
+        vectors = encoder.encode([source_text(row) for row in rows], batch_size=64, convert_to_numpy=True)
+        conn.execute(update_query, [
+            {"id": row.id, "version": row.version, "embedding": vector_index.vector_param(vector), "model": model}
+            for row, vector in zip(rows, vectors)
+        ])
+        if commit:
+            conn.commit()
+        written += len(rows)
+        after = rows[-1].id
+        print(f"   ... {table}: {written} rows embedded with {model}")
+    return written
+
+def _states(conn) -> Dict[str, Tuple[str, Optional[str]]]:
+    rows = conn.execute(text("SELECT table_name, active_model, shadow_model FROM embedding_versions")).all()
+    return {row.table_name: (row.active_model, row.shadow_model) for row in rows}
+
+def _shadow_model(conn) -> str:
+    shadow_models = {shadow for _, shadow in _states(conn).values()}
+    if len(shadow_models) != 1 or None in shadow_models:
+        raise RuntimeError("No embedding migration in progress; run `manage.py migrate-embeddings start` first")
+    return shadow_models.pop()
+
+def start_migration(engine, model: str, dim: int):
+    """Add a `vector(dim)` shadow column for `model` next to every table's `embedding`."""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT set_config('lock_timeout', :value, true)"), {"value": EMBEDDING_CUTOVER_LOCK_TIMEOUT})
+        conn.execute(text(CLEAR_SHADOW_FUNCTION))
+        states = _states(conn)
+        for table in SOURCES:
+            if table in states:
+                active, shadow = states[table]
+            else:
+                # The model most rows were written with; new tables start on this process's model
+                active = conn.execute(text(f"""
+                    SELECT embedding_model FROM {table} WHERE embedding_model IS NOT NULL
+                    GROUP BY embedding_model ORDER BY count(*) DESC LIMIT 1
+                """)).scalar() or MODEL_NAME
+                shadow = None
+            if active == model:
+                raise ValueError(f"{table} already holds {model} vectors")
+
+            if shadow != model:
+                conn.execute(text(f"DROP INDEX IF EXISTS {vector_index.index_name(table, SHADOW_COLUMN)}"))
+                conn.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {SHADOW_COLUMN}, DROP COLUMN IF EXISTS {SHADOW_COLUMN}_model"))
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {SHADOW_COLUMN} vector({int(dim)}), ADD COLUMN {SHADOW_COLUMN}_model VARCHAR"))
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {_trigger_name(table)} ON {table}"))
+            conn.execute(text(f"""
+                CREATE TRIGGER {_trigger_name(table)} BEFORE UPDATE ON {table}
+                FOR EACH ROW EXECUTE FUNCTION clear_stale_embedding_shadow()
+            """))
+            conn.execute(text("""
+                INSERT INTO embedding_versions (table_name, active_model, shadow_model) VALUES (:table, :active, :shadow)
+                ON CONFLICT (table_name) DO UPDATE SET active_model = EXCLUDED.active_model,
+                    shadow_model = EXCLUDED.shadow_model, updated_at = now()
+            """), {"table": table, "active": active, "shadow": model})
+            print(f"✅ {table}: {SHADOW_COLUMN} vector({dim}) ready for {model} (active: {active})")
+        conn.commit()
+
+def reembed(engine, batch_size: int = REEMBED_BATCH_SIZE, encoder=None) -> int:
+    """Fill the shadow columns with the new model's vectors; safe to stop and rerun at any time.
+
+    Returns the rows still waiting across every table.
+    """
+    with engine.connect() as conn:
+        model = _shadow_model(conn)
+        encoder = encoder or LazyModel(lambda: load_model(model_name=model))
+        total = 0
+        for table in SOURCES:
+            for _ in range(REEMBED_MAX_PASSES):
+                _reembed(conn, table, SHADOW_COLUMN, f"{SHADOW_COLUMN}_model", model, encoder, batch_size)
+                remaining = _count_pending(conn, table, f"{SHADOW_COLUMN}_model", model)
+                if not remaining:
+                    break
+            print(f"✅ {table}: {remaining} rows still waiting for {model} vectors")
+            total += remaining
+        return total
+
+def build_shadow_indexes(engine, index_type: str = vector_index.VECTOR_INDEX_TYPE):
+    """ANN indexes on the filled shadow columns, built without blocking reads or writes."""
+    if index_type == "none":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in SOURCES:
+            name = vector_index.index_name(table, SHADOW_COLUMN)
+            definition = vector_index.index_definition(conn, table, SHADOW_COLUMN, index_type, None)
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY {name} ON {table} {definition}"))
+            print(f"✅ {index_type} index created on {table}.{SHADOW_COLUMN}")
+
+def _swap(conn, table: str, a: str, b: str):
+    conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {a} TO {a}_swap"))
+    conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {b} TO {a}"))
+    conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {a}_swap TO {b}"))
+
+def cutover(engine, batch_size: int = REEMBED_BATCH_SIZE, index_type: str = vector_index.VECTOR_INDEX_TYPE) -> str:
+    """Make the shadow vectors the live ones, for every table at once.
+
+    Catches up on rows written since the last re-embed and builds the shadow
+    indexes first. Then, in one transaction: writes are blocked while the
+    last stragglers are embedded, and reads only for the column and index
+    renames. Returns the new active model.
+    """
+    with engine.connect() as conn:
+        model = _shadow_model(conn)
+    # Loaded and run once up front, so the locked section below never waits
+    # for weights to be read or the first forward pass to warm up
+    encoder = LazyModel(lambda: load_model(model_name=model))
+    encoder.encode(["warm up"], batch_size=1, convert_to_numpy=True)
+
+    if reembed(engine, batch_size, encoder):
+        raise RuntimeError("Some rows kept changing during re-embedding; run the cutover again")
+    build_shadow_indexes(engine, index_type)
+
+    with engine.connect() as conn:
+        if _shadow_model(conn) != model:
+            raise RuntimeError("The embedding migration changed during the cutover; run it again")
+        conn.execute(text("SELECT set_config('lock_timeout', :value, true)"), {"value": EMBEDDING_CUTOVER_LOCK_TIMEOUT})
+        conn.execute(text(f"LOCK TABLE {', '.join(SOURCES)} IN SHARE ROW EXCLUSIVE MODE"))
+        for table in SOURCES:
+            _reembed(conn, table, SHADOW_COLUMN, f"{SHADOW_COLUMN}_model", model, encoder, batch_size, commit=False)
+
+        conn.execute(text(f"LOCK TABLE {', '.join(SOURCES)} IN ACCESS EXCLUSIVE MODE"))
+        for table in SOURCES:
+            _swap(conn, table, "embedding", SHADOW_COLUMN)
+            _swap(conn, table, "embedding_model", f"{SHADOW_COLUMN}_model")
+            active_index, shadow_index = vector_index.index_name(table, "embedding"), vector_index.index_name(table, SHADOW_COLUMN)
+            conn.execute(text(f"ALTER INDEX IF EXISTS {active_index} RENAME TO {active_index}_swap"))
+            conn.execute(text(f"ALTER INDEX IF EXISTS {shadow_index} RENAME TO {active_index}"))
+            conn.execute(text(f"ALTER INDEX IF EXISTS {active_index}_swap RENAME TO {shadow_index}"))
+        conn.execute(text("""
+            UPDATE embedding_versions SET active_model = shadow_model, shadow_model = active_model, updated_at = now()
+        """))
+        conn.commit()
+    print(f"✅ Cut over to {model}")
+    return model
+
+def finish(engine, batch_size: int = REEMBED_BATCH_SIZE):
+    """Drop the shadow columns, once every worker runs the active model.
+
+    Before a cutover this abandons the migration instead. Vectors written
+    with another model in the meantime are re-embedded first.
+    """
+    with engine.connect() as conn:
+        for table, (active, _) in _states(conn).items():
+            encoder = LazyModel(lambda model=active: load_model(model_name=model))
+            _reembed(conn, table, "embedding", "embedding_model", active, encoder, batch_size)
+            conn.execute(text("SELECT set_config('lock_timeout', :value, true)"), {"value": EMBEDDING_CUTOVER_LOCK_TIMEOUT})
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {_trigger_name(table)} ON {table}"))
+            conn.execute(text(f"DROP INDEX IF EXISTS {vector_index.index_name(table, SHADOW_COLUMN)}"))
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {SHADOW_COLUMN}, DROP COLUMN IF EXISTS {SHADOW_COLUMN}_model"))
+            conn.execute(text("UPDATE embedding_versions SET shadow_model = NULL, updated_at = now() WHERE table_name = :table"), {"table": table})
+            conn.commit()
+            print(f"✅ {table}: serving {active}, shadow column dropped")
+
+def status(engine) -> dict:
+    with engine.connect() as conn:
+        result = {}
+        for table, (active, shadow) in _states(conn).items():
+            result[table] = {
+                "active_model": active,
+                "shadow_model": shadow,
+                "active_pending": _count_pending(conn, table, "embedding_model", active),
+                "shadow_pending": _count_pending(conn, table, f"{SHADOW_COLUMN}_model", shadow) if shadow else None,
+            }
+        return result
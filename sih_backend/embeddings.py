@@ -0,0 +1,337 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Vectors are tagged with the model that wrote them (see embedding_migration.py);
+# switch models with `manage.py migrate-embeddings` rather than by changing these alone
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384"))
+# Lowercase texts before they are encoded and cached. Only set it for models
+# with an uncased tokenizer, where case never changes the vector; the default
+# all-MiniLM-L6-v2 is one
+EMBEDDING_UNCASED = os.getenv(
+    "EMBEDDING_UNCASED", "1" if MODEL_NAME == "sentence-transformers/all-MiniLM-L6-v2" else "0"
+) == "1"
+# "torch" (SentenceTransformer), "onnx" (fp32 export) or "onnx-int8" (dynamically quantized export)
+EMBEDDING_RUNTIME = os.getenv("EMBEDDING_RUNTIME", "torch")
+# ONNX files shipped in the model's Hugging Face repo
+ONNX_MODEL_FILES = {
+    "onnx": "onnx/model.onnx",
+    "onnx-int8": os.getenv("EMBED_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx"),
+}
+EMBED_ONNX_THREADS = int(os.getenv("EMBED_ONNX_THREADS", "0"))
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+# Path of the optional sqlite tier; the cache is memory-only when unset
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+def normalize_text(text: str, lowercase: bool = EMBEDDING_UNCASED) -> str:
+    text = " ".join(text.split())
+    return text.lower() if lowercase else text
+
+def internship_text(title: Optional[str], company: Optional[str], skills: Optional[List[str]] = None) -> str:
+    """What an internship's vector is built from; without skills it is the original title + company text."""
+    text = f"{title or ''} {company or ''}"
+    if skills:
+        text += " " + ", ".join(skills)
+    return text
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """LRU cache of embeddings in memory, optionally backed by a sqlite file."""
+
+    def __init__(self, max_items: int = EMBEDDING_CACHE_SIZE, path: Optional[str] = EMBEDDING_CACHE_PATH):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._items.get(key)
+            if vector is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            if self._db is not None:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, vector: np.ndarray):
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (key, vector.tobytes())
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._items[key] = vector
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._items),
+                "max_size": self.max_items,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "disk_tier": self._db is not None,
+            }
+
+class OnnxEmbedder:
+    """MiniLM on ONNX Runtime, without importing torch.
+
+    Reproduces the SentenceTransformer pipeline (tokenize, mean-pool over the
+    attention mask, L2-normalize), so vectors are interchangeable with the
+    torch runtime's; see test_embedding_parity.py.
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, file_name: str = ONNX_MODEL_FILES["onnx"],
+                 max_seq_length: int = 256, threads: int = EMBED_ONNX_THREADS):
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(hf_hub_download(model_name, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(hf_hub_download(model_name, file_name), options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size=batch_size)[0]
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+            feeds = {
+                "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+                "attention_mask": mask,
+                "token_type_ids": np.array([e.type_ids for e in encoded], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self._input_names})[0]
+
+            weights = mask[..., None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            batches.append(pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12))
+
+        if not batches:
+            return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        return np.concatenate(batches).astype(np.float32, copy=False)
+
+def load_model(runtime: str = EMBEDDING_RUNTIME, model_name: str = MODEL_NAME):
+    """The embedding model for `runtime`; every runtime exposes SentenceTransformer's `encode`."""
+    if runtime == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    if runtime in ONNX_MODEL_FILES:
+        return OnnxEmbedder(model_name, ONNX_MODEL_FILES[runtime])
+    raise ValueError(f"Unknown embedding runtime: {runtime}")
+
+class LazyModel:
+    """Defers `loader()` (importing torch, reading weights) to the first encode or an explicit `load()`.
+
+    Safe to call from several threads; the loader runs once.
+    """
+
+    def __init__(self, loader: Callable[[], object]):
+        self._loader = loader
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._loader()
+        return self._model
+
+    def encode(self, *args, **kwargs):
+        return self.load().encode(*args, **kwargs)
+
+def model_id(runtime: str = EMBEDDING_RUNTIME, model_name: str = MODEL_NAME) -> str:
+    """Identifies the vectors a runtime produces, e.g. in cache keys; quantized vectors differ slightly."""
+    return model_name if runtime == "torch" else f"{model_name}:{runtime}"
+
+class CachedEmbedder:
+    """Wraps a SentenceTransformer so repeated texts skip the model.
+
+    `lowercase` must only be set for uncased models: the lowercased text is
+    both encoded and used as the cache key.
+    """
+
+    def __init__(self, model, model_name: str = MODEL_NAME, cache: Optional[EmbeddingCache] = None,
+                 lowercase: bool = EMBEDDING_UNCASED):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.lowercase = lowercase
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        texts = [normalize_text(t, self.lowercase) for t in texts]
+        keys = [cache_key(self.model_name, t) for t in texts]
+
+        vectors = [self.cache.get(k) for k in keys]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # Duplicate texts within one call are only encoded once
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = self.model.encode(unique_texts, convert_to_numpy=True)
+            by_text = dict(zip(unique_texts, encoded))
+            for i in missing:
+                vectors[i] = by_text[texts[i]]
+                self.cache.put(keys[i], vectors[i])
+
+        return np.stack(vectors).astype(np.float32, copy=False)
+
+    def encode_one(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+
+    def prime(self, text: str, vector):
+        """Store a vector computed elsewhere, e.g. restored from the extraction cache."""
+        self.cache.put(cache_key(self.model_name, normalize_text(text, self.lowercase)), vector)
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class EmbeddingBatcher:
+    """Gathers concurrent encode calls into one batched model call.
+
+    Callers block on `encode` while a background thread waits up to
+    `max_wait_ms` for more requests (or `max_batch_size` texts) and then runs a
+    single `model.encode` for all of them. It exposes the same `encode`
+    signature as the model, so it can sit underneath CachedEmbedder.
+    """
+
+    def __init__(self, model, max_batch_size: int = EMBED_BATCH_MAX_SIZE, max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = deque(maxlen=1000)
+        self._queue_waits = deque(maxlen=1000)
+
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        future = Future()
+        self._queue.put((list(texts), future, time.perf_counter()))
+        return future
+
+    def encode(self, texts: List[str], convert_to_numpy: bool = True) -> np.ndarray:
+        return self.submit(texts).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            texts = [t for request_texts, _, _ in batch for t in request_texts]
+
+            try:
+                vectors = self.model.encode(texts, batch_size=max(len(texts), 1), convert_to_numpy=True)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                continue
+
+            offset = 0
+            for request_texts, future, _ in batch:
+                future.set_result(vectors[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+            with self._lock:
+                self._batches += 1
+                self._items += len(texts)
+                self._batch_sizes.append(len(texts))
+                self._queue_waits.extend((started - enqueued) * 1000 for _, _, enqueued in batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes = list(self._batch_sizes)
+            waits = list(self._queue_waits)
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self._batches,
+                "items": self._items,
+                "queue_depth": self._queue.qsize(),
+                "batch_size_avg": sum(sizes) / len(sizes) if sizes else 0.0,
+                "batch_size_p95": _percentile(sizes, 0.95),
+                "queue_wait_ms_p50": _percentile(waits, 0.5),
+                "queue_wait_ms_p95": _percentile(waits, 0.95),
+                "queue_wait_ms_max": max(waits, default=0.0),
+            }
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", "extraction_cache.db")
+EXTRACTION_CACHE_MAX_MB = float(os.getenv("EXTRACTION_CACHE_MAX_MB", "256"))
+
+class CachedExtraction(BaseModel):
+    resume_text: str
+    skills: List[str]
+    embedding: Optional[List[float]] = None
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """Resume extraction results keyed by file hash and extractor version.
+
+    Entries live in a sqlite file whose payload size is capped at `max_bytes`;
+    the least recently used entries are evicted first. The file is opened on
+    first use, so importing the module touches nothing on disk.
+    """
+
+    def __init__(self, path: str = EXTRACTION_CACHE_PATH, max_bytes: int = int(EXTRACTION_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Called with self._lock held
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS extractions (
+                    key TEXT PRIMARY KEY,
+                    resume_text TEXT,
+                    skills TEXT,
+                    embedding BLOB,
+                    size INTEGER,
+                    last_access REAL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS ix_extractions_last_access ON extractions (last_access)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def key(file_sha256: str, version: str) -> str:
+        return hashlib.sha256(f"{file_sha256}\x00{version}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedExtraction]:
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT resume_text, skills, embedding FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            db.execute("UPDATE extractions SET last_access = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+            self.hits += 1
+
+        resume_text, skills, embedding = row
+        return CachedExtraction(
+            resume_text=resume_text,
+            skills=json.loads(skills),
+            embedding=np.frombuffer(embedding, dtype=np.float32).tolist() if embedding else None
+        )
+
+    def put(self, key: str, resume_text: str, skills: List[str], embedding: Optional[np.ndarray] = None):
+        skills_json = json.dumps(skills)
+        embedding_bytes = np.asarray(embedding, dtype=np.float32).tobytes() if embedding is not None else None
+        size = len(resume_text.encode("utf-8")) + len(skills_json) + len(embedding_bytes or b"")
+
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO extractions (key, resume_text, skills, embedding, size, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, resume_text, skills_json, embedding_bytes, size, time.time())
+            )
+            self._evict()
+            db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM extractions ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM extractions WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+extraction_cache = ExtractionCache()
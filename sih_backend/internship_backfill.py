@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+import models
+from embedding_migration import versions
+from embeddings import MODEL_NAME, internship_text, load_model
+from response_cache import INTERNSHIPS, response_cache
+
+# Internships extracted, embedded and staged per checkpoint
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "100"))
+# LLM calls in flight at once, and how many may start per minute across all of them
+BACKFILL_LLM_CONCURRENCY = int(os.getenv("BACKFILL_LLM_CONCURRENCY", "4"))
+BACKFILL_LLM_REQUESTS_PER_MINUTE = float(os.getenv("BACKFILL_LLM_REQUESTS_PER_MINUTE", "30"))
+# Attempts per internship; rate-limit errors back off 1s, 2s, 4s, ...
+BACKFILL_LLM_ATTEMPTS = int(os.getenv("BACKFILL_LLM_ATTEMPTS", "3"))
+
+PENDING_QUERY = text("""
+    SELECT i.id, i.internship_title, i.company_name, i.content_hash
+    FROM internships i
+    WHERE i.id > :after
+      AND (:all_rows OR i.skills IS NULL)
+      AND NOT EXISTS (SELECT 1 FROM internship_backfill s WHERE s.internship_id = i.id)
+    ORDER BY i.id
+    LIMIT :limit
+""")
+
+PENDING_COUNT_QUERY = text("""
+    SELECT count(*)
+    FROM internships i
+    WHERE (:all_rows OR i.skills IS NULL)
+      AND NOT EXISTS (SELECT 1 FROM internship_backfill s WHERE s.internship_id = i.id)
+""")
+
+def swap_query():
+    """One statement, so searches see either every old vector or every new one.
+
+    Vectors go into this process's model's column; rows staged with another
+    model and postings edited after they were staged keep their current row.
+    """
+    return text(f"""
+        UPDATE internships i
+        SET skills = s.skills, {versions.assignments("internships", "s.embedding")}
+        FROM internship_backfill s
+        WHERE i.id = s.internship_id AND i.content_hash IS NOT DISTINCT FROM s.content_hash
+          AND s.embedding_model = :model
+    """)
+
+class RateLimiter:
+    """Spaces calls evenly so at most `per_minute` start in any minute, across threads."""
+
+    def __init__(self, per_minute: float = BACKFILL_LLM_REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+_chain = None
+_chain_lock = threading.Lock()
+
+def _skills_chain():
+    global _chain
+    if _chain is None:
+        with _chain_lock:
+            if _chain is None:
+                from langchain.prompts import ChatPromptTemplate
+                from crud import SkillsOutput, get_llm
+
+                prompt = ChatPromptTemplate.from_template(
+                    """
+                    You are an expert HR assistant. Extract ONLY the technical and professional skills
+                    required for the following internship. Normalize them into a clean Python list.
+
+                    Internship: {title} at {company}
+                    """
+                )
+                _chain = prompt | get_llm().with_structured_output(SkillsOutput)
+    return _chain
+
+def extract_internship_skills(title: Optional[str], company: Optional[str]) -> List[str]:
+    skills_out = _skills_chain().invoke({"title": title or "", "company": company or ""})
+    found = {}
+    for skill in skills_out.skills:
+        skill = " ".join(skill.split())
+        if skill:
+            found.setdefault(skill.lower(), skill)
+    return list(found.values())
+
+class InternshipBackfill:
+    """Re-extracts internship skills with the LLM and re-embeds title, company and skills.
+
+    Results are staged in `internship_backfill` and committed batch by batch,
+    so an interrupted run resumes where it stopped. Search keeps serving the
+    old vectors until `swap` moves every staged row into `internships` in a
+    single UPDATE.
+    """
+
+    def __init__(self, batch_size: int = BACKFILL_BATCH_SIZE, concurrency: int = BACKFILL_LLM_CONCURRENCY,
+                 requests_per_minute: float = BACKFILL_LLM_REQUESTS_PER_MINUTE, attempts: int = BACKFILL_LLM_ATTEMPTS,
+                 extract_fn=extract_internship_skills, model=None):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(requests_per_minute)
+        self.attempts = attempts
+        self.extract_fn = extract_fn
+        self.model = model
+        self.staged = 0
+        self.failed = 0
+
+    def _extract(self, row) -> Optional[List[str]]:
+        for attempt in range(self.attempts):
+            self.limiter.acquire()
+            try:
+                return self.extract_fn(row.internship_title, row.company_name)
+            except Exception as e:
+                if attempt == self.attempts - 1:
+                    print(f"❌ Skill extraction failed for internship {row.id}: {e}")
+                    return None
+                time.sleep(2 ** attempt)
+
+    def stage_batch(self, db: Session, rows, pool: ThreadPoolExecutor) -> int:
+        """Extract, embed and stage one batch; returns the number of rows staged."""
+        skills = list(pool.map(self._extract, rows))
+        done = [(row, row_skills) for row, row_skills in zip(rows, skills) if row_skills is not None]
+        self.failed += len(rows) - len(done)
+        if not done:
+            return 0
+
+        if self.model is None:
+            self.model = load_model()
+        texts = [internship_text(row.internship_title, row.company_name, row_skills) for row, row_skills in done]
+        embeddings = self.model.encode(texts, batch_size=64, convert_to_numpy=True)
+
+        values = [
+            {"internship_id": row.id, "content_hash": row.content_hash, "skills": row_skills,
+             "embedding": embedding, "embedding_model": MODEL_NAME}
+            for (row, row_skills), embedding in zip(done, embeddings)
+        ]
+        statement = insert(models.InternshipBackfill).values(values)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[models.InternshipBackfill.internship_id],
+            set_={c: statement.excluded[c] for c in ("content_hash", "skills", "embedding", "embedding_model")}
+        ))
+        db.commit()
+        return len(done)
+
+    def stage(self, db: Session, all_rows: bool = False) -> int:
+        """Stage every pending internship: those without skills, or all of them with `all_rows`."""
+        total = db.execute(PENDING_COUNT_QUERY, {"all_rows": all_rows}).scalar()
+        print(f"✅ {total} internships to backfill")
+
+        after = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="backfill") as pool:
+            while True:
+                rows = db.execute(PENDING_QUERY, {"after": after, "all_rows": all_rows, "limit": self.batch_size}).all()
+                if not rows:
+                    break
+                self.staged += self.stage_batch(db, rows, pool)
+                after = rows[-1].id
+                print(f"   ... {self.staged}/{total} staged, {self.failed} failed")
+        return self.staged
+
+    def swap(self, db: Session) -> int:
+        """Atomically replace skills and vectors with the staged ones and clear the staging table."""
+        other_model = db.query(models.InternshipBackfill).filter(
+            models.InternshipBackfill.embedding_model.is_distinct_from(MODEL_NAME)
+        ).count()
+        if other_model:
+            print(f"❌ {other_model} staged internships were embedded with another model and are dropped; rerun to stage them again")
+        swapped = db.execute(swap_query(), {"model": MODEL_NAME}).rowcount
+        db.query(models.InternshipBackfill).delete(synchronize_session=False)
+        db.commit()
+        response_cache.bump(INTERNSHIPS)
+        return swapped
+
+    def run(self, db: Session, all_rows: bool = False) -> int:
+        """Stage, then swap in every staged row; failed internships keep their current row for a later run."""
+        self.stage(db, all_rows=all_rows)
+        swapped = self.swap(db)
+        print(f"✅ Swapped in skills and embeddings for {swapped} internships")
+        if self.failed:
+            print(f"❌ {self.failed} internships failed after {self.attempts} attempts each and were left as they were; rerun to retry them")
+        return swapped
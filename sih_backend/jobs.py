@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+import crud
+import embedding_migration
+import models
+import recommendations
+import skill_extractor
+import uploads
+from extraction_cache import extraction_cache, file_sha256
+from database import SessionLocal
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Set to 0 to run the workers as a separate `python jobs.py` process instead
+JOB_WORKERS_IN_PROCESS = os.getenv("JOB_WORKERS_IN_PROCESS", "1") == "1"
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_TIMEOUT_SECONDS = int(os.getenv("JOB_TIMEOUT_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+def fail_abandoned_jobs(db: Session, stale_before: datetime) -> int:
+    """Fail jobs whose worker died during their last allowed attempt.
+
+    Nothing else would pick them up again, so they would stay "running"
+    forever otherwise.
+    """
+    jobs = (
+        db.query(models.ExtractionJob)
+        .filter(
+            models.ExtractionJob.status == "running",
+            models.ExtractionJob.updated_at < stale_before,
+            models.ExtractionJob.attempts >= JOB_MAX_ATTEMPTS,
+        )
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for job in jobs:
+        job.status = "failed"
+        job.error = job.error or "Worker stopped before the job finished"
+        candidate = db.get(models.Candidate, job.candidate_id)
+        candidate.skills_status = "failed"
+    db.commit()
+    return len(jobs)
+
+def claim_job(db: Session):
+    """Lock the oldest runnable job so concurrent workers never pick the same one."""
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=JOB_TIMEOUT_SECONDS)
+    fail_abandoned_jobs(db, stale_before)
+    job = (
+        db.query(models.ExtractionJob)
+        .filter(
+            or_(
+                models.ExtractionJob.status == "queued",
+                # A worker that died mid-job leaves it "running"; retry it after the timeout
+                (models.ExtractionJob.status == "running") & (models.ExtractionJob.updated_at < stale_before),
+            ),
+            models.ExtractionJob.attempts < JOB_MAX_ATTEMPTS,
+        )
+        .order_by(models.ExtractionJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        return None
+
+    job.status = "running"
+    job.stage = "parsing"
+    job.attempts += 1
+    job.error = None
+    candidate = db.get(models.Candidate, job.candidate_id)
+    candidate.skills_status = "processing"
+    db.commit()
+    return job
+
+def _set_stage(db: Session, job, stage: str):
+    job.stage = stage
+    db.commit()
+
+def process_job(db: Session, job):
+    candidate = db.get(models.Candidate, job.candidate_id)
+
+    resume_sha256 = job.resume_sha256 or file_sha256(candidate.resume_path)
+    cache_key = extraction_cache.key(resume_sha256, crud.EXTRACTION_VERSION)
+    cached = extraction_cache.get(cache_key)
+
+    if cached:
+        skills = cached.skills
+        if cached.embedding is not None:
+            embedding = cached.embedding
+            crud.embedder.prime(" ".join(skills), cached.embedding)
+        else:
+            embedding = crud.embedder.encode_one(" ".join(skills))
+    else:
+        # `manage.py reextract` hands over text it already parsed; uploads are parsed
+        # here from the content-addressed file of the exact upload this job is for
+        resume_text = job.resume_text
+        if resume_text is None:
+            resume_path = candidate.resume_path
+            if job.resume_sha256:
+                stored_path = uploads.content_path(job.resume_sha256, candidate.resume_path)
+                if os.path.exists(stored_path):
+                    resume_path = stored_path
+            resume_text = crud.load_resume_text(resume_path)
+
+        _set_stage(db, job, "extracting")
+        extractor = skill_extractor.registry.get(db, crud.extract_skills)
+        skills = extractor.extract(resume_text).skills
+
+        _set_stage(db, job, "embedding")
+        # Warm the embedding cache so the candidate's first search skips the model
+        embedding = crud.embedder.encode_one(" ".join(skills))
+        extraction_cache.put(cache_key, resume_text, skills, embedding)
+
+    # Only a changed skill set (or a missing vector) needs its recommendations recomputed
+    stored = db.execute(embedding_migration.versions.vector_query("candidates"), {"id": candidate.id}).scalar()
+    if skills != candidate.skills or stored is None:
+        _set_stage(db, job, "recommending")
+        recommendations.refresh_candidate(db, candidate.id, embedding)
+
+    candidate.skills = skills
+    candidate.skills_status = "done"
+    job.status = "done"
+    job.stage = "done"
+    db.commit()
+
+def _fail_job(db: Session, job, exc: Exception):
+    db.rollback()
+    candidate = db.get(models.Candidate, job.candidate_id)
+    job.error = f"{type(exc).__name__}: {exc}"
+    if job.attempts >= JOB_MAX_ATTEMPTS:
+        job.status = "failed"
+        candidate.skills_status = "failed"
+    else:
+        job.status = "queued"
+        candidate.skills_status = "pending"
+    db.commit()
+
+def run_worker(stop: threading.Event):
+    while not stop.is_set():
+        job = None
+        db = SessionLocal()
+        try:
+            job = claim_job(db)
+            if job is not None:
+                process_job(db, job)
+        except Exception as exc:
+            if job is None:
+                print(f"❌ Could not claim an extraction job: {exc}")
+            else:
+                print(f"❌ Extraction job {job.id} failed: {exc}")
+                _fail_job(db, job, exc)
+        finally:
+            db.close()
+
+        if job is None:
+            stop.wait(JOB_POLL_INTERVAL)
+
+_stop = threading.Event()
+_workers = []
+
+def start_workers(count: int = JOB_WORKERS):
+    _stop.clear()
+    for i in range(count):
+        worker = threading.Thread(target=run_worker, args=(_stop,), name=f"extraction-worker-{i}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+    print(f"✅ {count} extraction workers started")
+
+def stop_workers(timeout: float = 5):
+    _stop.set()
+    for worker in _workers:
+        worker.join(timeout)
+    _workers.clear()
+
+if __name__ == "__main__":
+    embedding_migration.start(SessionLocal)
+    start_workers()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop_workers()
+        embedding_migration.stop()
@@ -1,16 +1,29 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, UploadFile, File, Form
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-import shutil
-import os
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
+import batch_match
 import crud
+import embedding_migration
+import jobs
 import models
+import offload
+import pdf_text
+import recommendations
+import reranker
 import schemas
-from database import SessionLocal, engine, init_db
-
-models.Base.metadata.create_all(bind=engine)
+import search_backends
+import skill_extractor
+import uploads
+import warmup
+from extraction_cache import extraction_cache
+from response_cache import INTERNSHIPS, normalize_skills, response_cache
+from database import SessionLocal, async_engine, get_async_db, init_db
 
 # Dependency
 def get_db():
@@ -25,7 +38,19 @@ from contextlib import asynccontextmanager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    embedding_migration.start(SessionLocal)
+    search_backends.start(SessionLocal)
+    if warmup.WARM_UP_ON_STARTUP:
+        warmup.warm_up.start()
+    if jobs.JOB_WORKERS_IN_PROCESS:
+        jobs.start_workers()
     yield
+    if jobs.JOB_WORKERS_IN_PROCESS:
+        jobs.stop_workers()
+    search_backends.stop()
+    embedding_migration.stop()
+    await async_engine.dispose()
+    offload.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -47,33 +72,136 @@ def create_internship(internship: schemas.InternshipCreate, db: Session = Depend
 
 @app.get("/internships/", response_model=List[schemas.Internship])
 def read_internships(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    internships = crud.get_internships(db, skip=skip, limit=limit)
+    cache_key = response_cache.key(INTERNSHIPS, route="list", skip=skip, limit=limit)
+    internships = response_cache.get(cache_key)
+    if internships is None:
+        internships = [schemas.Internship.model_validate(i).model_dump(mode="json") for i in crud.get_internships(db, skip=skip, limit=limit)]
+        response_cache.put(cache_key, internships)
     return internships
 
+def server_timing(timings: dict) -> str:
+    """Per-stage durations as a Server-Timing header, visible in browser devtools and access logs."""
+    entries = []
+    for stage in ("embed", "retrieve", "rerank"):
+        if stage in timings:
+            entry = f"{stage};dur={timings[stage]:.1f}"
+            if stage == "rerank":
+                entry += f';desc="{timings["rerank_status"]}"'
+            entries.append(entry)
+    return ", ".join(entries)
+
 @app.post("/search/")
-def search_internships(candidate_skills: schemas.CandidateSkills, limit: int = 5, db: Session = Depends(get_db)):
-    return crud.search_internships(db=db, candidate_skills=candidate_skills, limit=limit)
+async def search_internships(
+    candidate_skills: schemas.CandidateSkills,
+    response: Response,
+    limit: int = 5,
+    filters: schemas.SearchFilters = Depends(),
+    ef_search: Optional[int] = Query(None, ge=1, le=1000),
+    probes: Optional[int] = Query(None, ge=1, le=10000),
+    hybrid: Optional[bool] = None,
+    rerank: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Searched exactly as keyed, so every request sharing an entry gets the same answer
+    candidate_skills = schemas.CandidateSkills(skills=normalize_skills(candidate_skills.skills))
+    cache_key = response_cache.key(
+        INTERNSHIPS, route="search", skills=candidate_skills.skills, limit=limit,
+        filters=filters.model_dump(), ef_search=ef_search, probes=probes, hybrid=hybrid, rerank=rerank
+    )
+    results = response_cache.get(cache_key)
+    if results is not None:
+        response.headers["Server-Timing"] = 'cache;desc="hit"'
+        return results
+
+    timings = {}
+    results = await crud.search_internships_async(
+        db=db, candidate_skills=candidate_skills, limit=limit, filters=filters, ef_search=ef_search, probes=probes,
+        hybrid=hybrid, rerank=rerank, timings=timings
+    )
+    # A rerank that fell back is a degraded answer; let the next request try again
+    if timings.get("rerank_status", "reranked") == "reranked":
+        results = jsonable_encoder(results)
+        response_cache.put(cache_key, results)
+    response.headers["Server-Timing"] = server_timing(timings)
+    return results
+
+@app.post("/match/batch")
+def match_batch(request: schemas.BatchMatchRequest, db: Session = Depends(get_db)):
+    """Top-k internships for many candidates at once, streamed back as NDJSON."""
+    total = len(request.candidate_ids) + len(request.skills)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="Provide candidate_ids or skills")
+    if total > batch_match.BATCH_MATCH_MAX_CANDIDATES:
+        raise HTTPException(status_code=400, detail=f"At most {batch_match.BATCH_MATCH_MAX_CANDIDATES} candidates per request")
+    if not 1 <= request.limit <= batch_match.BATCH_MATCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {batch_match.BATCH_MATCH_MAX_LIMIT}")
+
+    # Everything that needs the session is loaded before streaming starts
+    items = batch_match.load_items(db, request)
+    internships = batch_match.InternshipMatrix.load(db)
+    return StreamingResponse(
+        batch_match.stream_matches(items, internships, request.limit),
+        media_type="application/x-ndjson"
+    )
+
+@app.get("/internships/{internship_id}/applicants")
+async def read_applicants(
+    internship_id: int,
+    limit: int = 5,
+    ef_search: Optional[int] = Query(None, ge=1, le=1000),
+    probes: Optional[int] = Query(None, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    applicants = await crud.search_applicants_async(db, internship_id, limit=limit, ef_search=ef_search, probes=probes)
+    if applicants is None:
+        raise HTTPException(status_code=404, detail="Internship not found")
+    return applicants
+
+@app.post("/internships/applicants/batch")
+def rank_applicants_batch(request: schemas.BatchApplicantsRequest, db: Session = Depends(get_db)):
+    """Top applicants for many postings in one vectorized pass, streamed back as NDJSON."""
+    if not request.internship_ids and request.company_name is None:
+        raise HTTPException(status_code=400, detail="Provide internship_ids or company_name")
+    if not 1 <= request.limit <= batch_match.BATCH_MATCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {batch_match.BATCH_MATCH_MAX_LIMIT}")
+
+    internship_ids = set(request.internship_ids)
+    if request.company_name is not None:
+        internship_ids.update(
+            row.id for row in db.query(models.Internship.id).filter(models.Internship.company_name == request.company_name)
+        )
+    if len(internship_ids) > batch_match.BATCH_MATCH_MAX_CANDIDATES:
+        raise HTTPException(status_code=400, detail=f"At most {batch_match.BATCH_MATCH_MAX_CANDIDATES} postings per request")
 
-@app.post("/candidates/", response_model=schemas.Candidate)
-def create_candidate(
+    postings = batch_match.InternshipMatrix.load(db, sorted(internship_ids))
+    candidates = batch_match.CandidateMatrix.load(db)
+    return StreamingResponse(
+        batch_match.stream_applicants(postings, candidates, request.limit),
+        media_type="application/x-ndjson"
+    )
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject oversized uploads before the multipart body is read at all
+    if request.method == "POST" and request.url.path == "/candidates/":
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > uploads.UPLOAD_MAX_REQUEST_BYTES:
+            return JSONResponse(status_code=413, content={"detail": "Upload too large"})
+    return await call_next(request)
+
+@app.post("/candidates/", response_model=schemas.CandidateUpload)
+async def create_candidate(
     name: str = Form(...),
     email: str = Form(...),
     father_income: float = Form(None),
     preferred_location: str = Form(None),
     resume: UploadFile = File(...),
     income_certificate: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-
-    resume_path = os.path.join(upload_dir, resume.filename)
-    with open(resume_path, "wb") as buffer:
-        shutil.copyfileobj(resume.file, buffer)
-
-    income_certificate_path = os.path.join(upload_dir, income_certificate.filename)
-    with open(income_certificate_path, "wb") as buffer:
-        shutil.copyfileobj(income_certificate.file, buffer)
+    # Only storing and hashing happen here; a cache miss is parsed by the extraction job
+    stored_resume = await uploads.store_upload(resume)
+    stored_certificate = await uploads.store_upload(income_certificate)
 
     candidate_data = schemas.CandidateCreate(
         name=name,
@@ -82,13 +210,66 @@ def create_candidate(
         preferred_location=preferred_location
     )
     
-    return crud.create_candidate(
+    db_candidate, db_job = await crud.create_candidate_async(
         db=db,
         candidate=candidate_data,
-        resume_path=resume_path,
-        income_certificate_path=income_certificate_path
+        resume_path=stored_resume.path,
+        income_certificate_path=stored_certificate.path,
+        resume_sha256=stored_resume.sha256
+    )
+    return schemas.CandidateUpload(
+        **schemas.Candidate.model_validate(db_candidate).model_dump(),
+        job_id=db_job.id
     )
 
+@app.get("/candidates/{candidate_id}/recommendations")
+async def read_recommendations(
+    candidate_id: int,
+    limit: int = Query(recommendations.RECOMMENDATIONS_TOP_K, ge=1, le=recommendations.RECOMMENDATIONS_TOP_K),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """The candidate's precomputed matches; same fields as /search/ results."""
+    return await recommendations.get_recommendations_async(db, candidate_id, limit)
+
+@app.get("/jobs/{job_id}", response_model=schemas.ExtractionJob)
+async def read_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_job = await crud.get_extraction_job(db, job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@app.get("/metrics/")
+def read_metrics():
+    return {
+        "embedding_cache": crud.embedder.cache.stats(),
+        "embedding_batcher": crud.embedding_batcher.stats(),
+        "skill_extractor": skill_extractor.registry.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "pdf_text": pdf_text.pdf_extractor.stats(),
+        "reranker": reranker.reranker.stats(),
+        "warm_up": warmup.warm_up.stats(),
+        "response_cache": response_cache.stats(),
+        "embedding_versions": embedding_migration.versions.stats(),
+        "search_backend": search_backends.numpy_index.stats() if search_backends.numpy_index is not None else {"backend": "pgvector"},
+    }
+
+@app.get("/health")
+def liveness():
+    """Liveness: the process is up and serving. Never touches models or the database."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def readiness(db: AsyncSession = Depends(get_async_db)):
+    """Readiness: models are warm and the database answers; 503 until then."""
+    checks = {"warm_up": warmup.warm_up.ready or not warmup.WARM_UP_ON_STARTUP}
+    try:
+        await db.execute(text("SELECT 1"))
+        checks["database"] = True
+    except Exception:
+        checks["database"] = False
+    status_code = 200 if all(checks.values()) else 503
+    return JSONResponse(status_code=status_code, content={"ready": status_code == 200, "checks": checks})
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Internship Matching API"}
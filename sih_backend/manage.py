@@ -0,0 +1,235 @@
+import argparse
+import json
+import sys
+
+import embedding_migration
+import models
+import schemas
+import pdf_text
+import recommendations
+import search_backends
+import vector_index
+from database import SessionLocal, engine
+from extraction_cache import file_sha256
+
+def _session():
+    """A session with embedding_versions loaded, so vectors are read and written in this model's column."""
+    db = SessionLocal()
+    embedding_migration.versions.refresh(db)
+    return db
+
+def reextract(workers: int = pdf_text.PDF_BATCH_WORKERS):
+    """Re-parse every candidate's resume in a process pool and queue skill extraction."""
+    db = SessionLocal()
+    try:
+        candidates = db.query(models.Candidate).filter(models.Candidate.resume_path.isnot(None)).all()
+        paths = [c.resume_path for c in candidates]
+        texts = pdf_text.extract_many(paths, workers=workers)
+
+        queued = 0
+        for candidate, resume_text in zip(candidates, texts):
+            if not resume_text:
+                continue
+            db.add(models.ExtractionJob(
+                candidate_id=candidate.id,
+                status="queued",
+                stage="queued",
+                attempts=0,
+                resume_sha256=file_sha256(candidate.resume_path),
+                resume_text=resume_text
+            ))
+            candidate.skills_status = "pending"
+            queued += 1
+        db.commit()
+        print(f"✅ Queued {queued}/{len(candidates)} candidates for skill extraction")
+    finally:
+        db.close()
+
+def reindex(index_type: str = vector_index.VECTOR_INDEX_TYPE, lists: int = None):
+    """Rebuild the ANN indexes, e.g. after a bulk load or to switch between HNSW and IVFFlat."""
+    vector_index.rebuild(engine, index_type=index_type, lists=lists)
+
+def build_index(dtype: str = search_backends.NUMPY_INDEX_DTYPE, ivf_lists: int = search_backends.NUMPY_INDEX_IVF_LISTS):
+    """Rebuild the on-disk NumPy index; running API workers load it at their next refresh."""
+    db = _session()
+    try:
+        search_backends.NumpyVectorIndex(dtype=dtype, ivf_lists=ivf_lists).build(db)
+    finally:
+        db.close()
+
+def recommend(k: int = recommendations.RECOMMENDATIONS_TOP_K):
+    """Recompute every candidate's materialized recommendations, e.g. after a bulk internship load."""
+    from crud import embedder
+
+    db = _session()
+    try:
+        candidates = db.query(models.Candidate).filter(models.Candidate.skills.isnot(None)).all()
+        stored = embedding_migration.versions.vector_query("candidates")
+        for candidate in candidates:
+            embedding = db.execute(stored, {"id": candidate.id}).scalar()
+            if embedding is None:
+                embedding = embedder.encode_one(" ".join(candidate.skills))
+            recommendations.refresh_candidate(db, candidate.id, embedding, k)
+            db.commit()
+        print(f"✅ Refreshed recommendations for {len(candidates)} candidates")
+    finally:
+        db.close()
+
+def backfill_internships(all_rows: bool = False, batch_size: int = None, concurrency: int = None, requests_per_minute: float = None):
+    """Extract internship skills with the LLM, re-embed title, company and skills, and swap the vectors in."""
+    import internship_backfill
+
+    options = {"batch_size": batch_size, "concurrency": concurrency, "requests_per_minute": requests_per_minute}
+    backfill = internship_backfill.InternshipBackfill(**{k: v for k, v in options.items() if v is not None})
+    db = _session()
+    try:
+        swapped = backfill.run(db, all_rows=all_rows)
+    finally:
+        db.close()
+    if swapped:
+        # Materialized recommendations were scored against the old vectors
+        recommend()
+        if search_backends.SEARCH_BACKEND == "numpy":
+            build_index()
+
+def migrate_embeddings(step: str, model: str = None, dim: int = None, batch_size: int = None):
+    """Move every stored vector to another embedding model without downtime; see embedding_migration.py."""
+    from embeddings import MODEL_NAME
+
+    batch_size = batch_size or embedding_migration.REEMBED_BATCH_SIZE
+    if step == "start":
+        if not model or not dim:
+            raise SystemExit("start needs --model and --dim")
+        embedding_migration.start_migration(engine, model, dim)
+    elif step == "reembed":
+        embedding_migration.reembed(engine, batch_size)
+    elif step == "cutover":
+        active = embedding_migration.cutover(engine, batch_size)
+        if search_backends.SEARCH_BACKEND == "numpy":
+            build_index()
+        if MODEL_NAME == active:
+            recommend()
+        else:
+            print(f"✅ Now roll the workers to EMBEDDING_MODEL={active}, then run `migrate-embeddings finish` with it")
+    elif step == "finish":
+        embedding_migration.finish(engine, batch_size)
+        recommend()
+    else:
+        print(json.dumps(embedding_migration.status(engine), indent=2))
+
+def match(candidate_ids=None, all_candidates: bool = False, skills_file: str = None, limit: int = 5, output: str = None):
+    """Batch matching from the command line; writes the same NDJSON as POST /match/batch."""
+    import batch_match
+
+    if limit < 1:
+        raise SystemExit("--limit must be at least 1")
+    db = _session()
+    try:
+        candidate_ids = list(candidate_ids or [])
+        if all_candidates:
+            candidate_ids += [row.id for row in db.query(models.Candidate.id).filter(models.Candidate.skills.isnot(None)).order_by(models.Candidate.id)]
+        skills = []
+        if skills_file:
+            with open(skills_file, encoding="utf-8") as f:
+                skills = [json.loads(line) for line in f if line.strip()]
+
+        request = schemas.BatchMatchRequest(candidate_ids=candidate_ids, skills=skills, limit=limit)
+        items = batch_match.load_items(db, request)
+        internships = batch_match.InternshipMatrix.load(db)
+    finally:
+        db.close()
+
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    try:
+        for chunk in batch_match.stream_matches(items, internships, limit):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
+    print(f"✅ Matched {len(items)} candidates against {len(internships)} internships", file=sys.stderr)
+
+def applicants(internship_ids=None, company_name: str = None, limit: int = 5, output: str = None):
+    """Rank applicants for many postings in one pass; writes the same NDJSON as POST /internships/applicants/batch."""
+    import batch_match
+
+    if limit < 1:
+        raise SystemExit("--limit must be at least 1")
+    db = _session()
+    try:
+        internship_ids = set(internship_ids or [])
+        if company_name is not None:
+            internship_ids.update(row.id for row in db.query(models.Internship.id).filter(models.Internship.company_name == company_name))
+        postings = batch_match.InternshipMatrix.load(db, sorted(internship_ids))
+        candidates = batch_match.CandidateMatrix.load(db)
+    finally:
+        db.close()
+
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    try:
+        for chunk in batch_match.stream_applicants(postings, candidates, limit):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
+    print(f"✅ Ranked {len(candidates)} applicants for {len(postings)} postings", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Admin commands for the internship matching backend.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reextract_parser = commands.add_parser("reextract", help="Re-extract resume text for all candidates and queue skill extraction.")
+    reextract_parser.add_argument("--workers", type=int, default=pdf_text.PDF_BATCH_WORKERS, help="Processes used to parse PDFs.")
+
+    reindex_parser = commands.add_parser("reindex", help="Rebuild the vector indexes without blocking reads or writes.")
+    reindex_parser.add_argument("--type", choices=["hnsw", "ivfflat", "none"], default=vector_index.VECTOR_INDEX_TYPE, help="Index type to build.")
+    reindex_parser.add_argument("--lists", type=int, default=None, help="IVFFlat list count (default: rows / 1000).")
+
+    build_index_parser = commands.add_parser("build-index", help="Rebuild the NumPy vector index used by SEARCH_BACKEND=numpy.")
+    build_index_parser.add_argument("--dtype", choices=["float32", "int8"], default=search_backends.NUMPY_INDEX_DTYPE, help="Storage type of the vectors.")
+    build_index_parser.add_argument("--ivf-lists", type=int, default=search_backends.NUMPY_INDEX_IVF_LISTS, help="IVF list count (0 = exact search).")
+
+    recommend_parser = commands.add_parser("recommend", help="Recompute all materialized candidate recommendations.")
+    recommend_parser.add_argument("--k", type=int, default=recommendations.RECOMMENDATIONS_TOP_K, help="Internships kept per candidate.")
+
+    backfill_parser = commands.add_parser("backfill-internships", help="Extract internship skills and re-embed internships; resumable.")
+    backfill_parser.add_argument("--all", action="store_true", help="Redo every internship, not only those without skills.")
+    backfill_parser.add_argument("--batch-size", type=int, default=None, help="Internships staged per checkpoint.")
+    backfill_parser.add_argument("--concurrency", type=int, default=None, help="LLM calls in flight at once.")
+    backfill_parser.add_argument("--rpm", type=float, default=None, help="LLM requests started per minute.")
+
+    migrate_parser = commands.add_parser("migrate-embeddings", help="Switch stored vectors to another embedding model without downtime.")
+    migrate_parser.add_argument("step", choices=["start", "reembed", "cutover", "finish", "status"], help="Migration step to run.")
+    migrate_parser.add_argument("--model", default=None, help="New model name (start only).")
+    migrate_parser.add_argument("--dim", type=int, default=None, help="New model's vector dimension (start only).")
+    migrate_parser.add_argument("--batch-size", type=int, default=None, help="Rows encoded and committed per batch.")
+
+    match_parser = commands.add_parser("match", help="Top-k internships for many candidates, written as NDJSON.")
+    match_parser.add_argument("--ids", type=int, nargs="*", default=[], help="Candidate ids to match.")
+    match_parser.add_argument("--all", action="store_true", help="Match every candidate with extracted skills.")
+    match_parser.add_argument("--skills-file", default=None, help="File with one JSON list of skills per line.")
+    match_parser.add_argument("--limit", type=int, default=5, help="Internships per candidate.")
+    match_parser.add_argument("--output", default=None, help="Output file (default: stdout).")
+
+    applicants_parser = commands.add_parser("applicants", help="Top applicants for many postings, written as NDJSON.")
+    applicants_parser.add_argument("--ids", type=int, nargs="*", default=[], help="Internship ids to rank applicants for.")
+    applicants_parser.add_argument("--company", default=None, help="Rank applicants for every posting of this company.")
+    applicants_parser.add_argument("--limit", type=int, default=5, help="Applicants per posting.")
+    applicants_parser.add_argument("--output", default=None, help="Output file (default: stdout).")
+
+    args = parser.parse_args()
+    if args.command == "reextract":
+        reextract(workers=args.workers)
+    elif args.command == "reindex":
+        reindex(index_type=args.type, lists=args.lists)
+    elif args.command == "build-index":
+        build_index(dtype=args.dtype, ivf_lists=args.ivf_lists)
+    elif args.command == "backfill-internships":
+        backfill_internships(all_rows=args.all, batch_size=args.batch_size, concurrency=args.concurrency, requests_per_minute=args.rpm)
+    elif args.command == "migrate-embeddings":
+        migrate_embeddings(args.step, model=args.model, dim=args.dim, batch_size=args.batch_size)
+    elif args.command == "match":
+        match(candidate_ids=args.ids, all_candidates=args.all, skills_file=args.skills_file, limit=args.limit, output=args.output)
+    elif args.command == "recommend":
+        recommend(k=args.k)
+    elif args.command == "applicants":
+        applicants(internship_ids=args.ids, company_name=args.company, limit=args.limit, output=args.output)
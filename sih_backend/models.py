@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, Float, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Float, Text, ForeignKey, Index
+from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import ARRAY
 from pgvector.sqlalchemy import Vector
 from database import Base
+from embeddings import EMBEDDING_DIM
 
 class Internship(Base):
     __tablename__ = "internships"
@@ -17,7 +19,13 @@ class Internship(Base):
     stipend_avg = Column(Integer)
     is_remote = Column(Boolean)
     skills = Column(ARRAY(Text))
-    embedding = Column(Vector(384))
+    embedding = Column(Vector(EMBEDDING_DIM))
+    # Model that wrote `embedding`; see embedding_migration.py
+    embedding_model = Column(String)
+    source_key = Column(String, unique=True, index=True)
+    content_hash = Column(String)
+    # Bumped by the touch_internship trigger when a field the NumPy index holds changes
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Candidate(Base):
     __tablename__ = "candidates"
@@ -30,3 +38,57 @@ class Candidate(Base):
     preferred_location = Column(String)
     resume_path = Column(String)
     income_certificate_path = Column(String)
+    skills_status = Column(String, default="pending")
+    # Embedding of the extracted skills, as used by /search/
+    embedding = Column(Vector(EMBEDDING_DIM))
+    embedding_model = Column(String)
+
+class ExtractionJob(Base):
+    __tablename__ = "extraction_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.id"), index=True)
+    status = Column(String, default="queued", index=True)
+    stage = Column(String, default="queued")
+    attempts = Column(Integer, default=0)
+    error = Column(Text)
+    resume_sha256 = Column(String, index=True)
+    resume_text = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class CandidateRecommendation(Base):
+    """A candidate's materialized top-k internships; see recommendations.py."""
+    __tablename__ = "candidate_recommendations"
+
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), primary_key=True)
+    internship_id = Column(Integer, ForeignKey("internships.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, nullable=False)
+    similarity = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_candidate_recommendations_rank", "candidate_id", "rank"),
+    )
+
+class InternshipBackfill(Base):
+    """Skills and vectors staged by internship_backfill.py until they are swapped in."""
+    __tablename__ = "internship_backfill"
+
+    internship_id = Column(Integer, ForeignKey("internships.id", ondelete="CASCADE"), primary_key=True)
+    # The posting's content_hash when it was staged; rows edited since then are not swapped
+    content_hash = Column(String)
+    skills = Column(ARRAY(Text))
+    # No fixed dimension, so staged rows survive an embedding model migration
+    embedding = Column(Vector())
+    embedding_model = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class EmbeddingVersion(Base):
+    """Which model's vectors each table holds in `embedding` and, during a migration, `embedding_shadow`."""
+    __tablename__ = "embedding_versions"
+
+    table_name = Column(String, primary_key=True)
+    active_model = Column(String, nullable=False)
+    shadow_model = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
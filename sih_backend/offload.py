@@ -0,0 +1,24 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "4"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+RERANK_WORKERS = int(os.getenv("RERANK_WORKERS", "1"))
+
+# Separate bounded pools so slow resume uploads can never take the threads
+# that /search/ needs for encoding.
+embed_executor = ThreadPoolExecutor(max_workers=EMBED_WORKERS, thread_name_prefix="embed")
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+# Cross-encoder passes are the slowest per request; keep them off the embed pool
+rerank_executor = ThreadPoolExecutor(max_workers=RERANK_WORKERS, thread_name_prefix="rerank")
+
+async def run_in(executor, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+def shutdown():
+    embed_executor.shutdown(wait=False, cancel_futures=True)
+    upload_executor.shutdown(wait=False, cancel_futures=True)
+    rerank_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,132 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Union
+
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "10"))
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "20000"))
+PDF_BATCH_WORKERS = int(os.getenv("PDF_BATCH_WORKERS", str(os.cpu_count() or 1)))
+
+Source = Union[str, bytes]
+
+def _pypdfium2_pages(source: Source, max_pages: int) -> Iterable[str]:
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(source)
+    try:
+        for i in range(min(len(pdf), max_pages)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            yield textpage.get_text_range()
+            textpage.close()
+            page.close()
+    finally:
+        pdf.close()
+
+def _pdfminer_pages(source: Source, max_pages: int) -> Iterable[str]:
+    from pdfminer.high_level import extract_text
+
+    fp = io.BytesIO(source) if isinstance(source, bytes) else source
+    text = extract_text(fp, maxpages=max_pages)
+    yield from text.split("\f")
+
+def _pypdf_pages(source: Source, max_pages: int) -> Iterable[str]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+    for page in reader.pages[:max_pages]:
+        yield page.extract_text() or ""
+
+# Preferred order before any timings exist
+BACKENDS: Dict[str, Callable[[Source, int], Iterable[str]]] = {
+    "pypdfium2": _pypdfium2_pages,
+    "pdfminer": _pdfminer_pages,
+    "pypdf": _pypdf_pages,
+}
+
+class PdfTextExtractor:
+    """Extracts text from every page within a page/character budget.
+
+    Backends are tried fastest first, by a moving average of measured
+    milliseconds per page; a backend that is missing, fails or returns no
+    text falls through to the next one.
+    """
+
+    def __init__(self, max_pages: int = PDF_MAX_PAGES, max_chars: int = PDF_MAX_CHARS):
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._ms_per_page: Dict[str, float] = {}
+        self._unavailable = set()
+
+    def _ordered_backends(self) -> List[str]:
+        with self._lock:
+            names = [name for name in BACKENDS if name not in self._unavailable]
+            unmeasured = [name for name in names if name not in self._ms_per_page]
+            measured = sorted((name for name in names if name in self._ms_per_page), key=self._ms_per_page.get)
+            return unmeasured + measured
+
+    def _record(self, name: str, elapsed: float, pages: int):
+        ms = elapsed * 1000 / max(pages, 1)
+        with self._lock:
+            previous = self._ms_per_page.get(name)
+            self._ms_per_page[name] = ms if previous is None else 0.8 * previous + 0.2 * ms
+
+    def extract(self, source: Source) -> str:
+        last_error = None
+        for name in self._ordered_backends():
+            started = time.perf_counter()
+            try:
+                pages = []
+                chars = 0
+                for page_text in BACKENDS[name](source, self.max_pages):
+                    # Keep line breaks: the skill extractor finds resume sections by their heading lines
+                    page_text = "\n".join(" ".join(line.split()) for line in page_text.splitlines() if line.strip())
+                    pages.append(page_text[:self.max_chars - chars])
+                    chars += len(pages[-1])
+                    if chars >= self.max_chars:
+                        break
+            except ImportError:
+                with self._lock:
+                    self._unavailable.add(name)
+                continue
+            except Exception as exc:
+                last_error = exc
+                continue
+
+            self._record(name, time.perf_counter() - started, len(pages))
+            text = "\n".join(p for p in pages if p)
+            if text:
+                return text
+
+        if last_error is not None:
+            raise last_error
+        return ""
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_pages": self.max_pages,
+                "max_chars": self.max_chars,
+                "ms_per_page": dict(self._ms_per_page),
+                "unavailable": sorted(self._unavailable),
+            }
+
+pdf_extractor = PdfTextExtractor()
+
+def extract_text(source: Source) -> str:
+    return pdf_extractor.extract(source)
+
+def extract_many(paths: List[str], workers: int = PDF_BATCH_WORKERS) -> List[str]:
+    """Extract many files in a process pool; unreadable files come back as ''."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_extract_or_empty, paths, chunksize=8))
+
+def _extract_or_empty(path: str) -> str:
+    try:
+        return extract_text(path)
+    except Exception as exc:
+        print(f"❌ Could not extract {path}: {exc}")
+        return ""
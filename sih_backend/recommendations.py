@@ -0,0 +1,118 @@
+import functools
+import os
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import vector_index
+from embedding_migration import versions
+from embeddings import MODEL_NAME
+
+# Internships kept per candidate in candidate_recommendations
+RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "20"))
+
+def refresh_candidate_statements(candidate_id: int, embedding, k: int = RECOMMENDATIONS_TOP_K,
+                                 binary: bool = False) -> List[Tuple[object, dict]]:
+    """Store the candidate's embedding and replace their recommendations with a fresh ANN top-k."""
+    params = {"candidate_id": candidate_id, "embedding": vector_index.vector_param(embedding, binary), "k": k, "model": MODEL_NAME}
+    return [(statement, params) for statement in _refresh_candidate_queries(
+        versions.assignments("candidates"), versions.differs("candidates"), versions.column("internships")
+    )]
+
+@functools.lru_cache(maxsize=None)
+def _refresh_candidate_queries(assignments: str, differs: str, internship_column: str):
+    return [
+        # Rewriting an unchanged vector would invalidate its shadow during a model migration
+        text(f"""
+            UPDATE candidates SET {assignments}
+            WHERE id = :candidate_id AND {differs}
+        """),
+        text("DELETE FROM candidate_recommendations WHERE candidate_id = :candidate_id"),
+        text(f"""
+            INSERT INTO candidate_recommendations (candidate_id, internship_id, rank, similarity)
+            SELECT CAST(:candidate_id AS integer), id, row_number() OVER (ORDER BY distance), 1 - distance
+            FROM (
+                SELECT id, {internship_column} <=> CAST(:embedding AS vector) AS distance
+                FROM internships
+                WHERE {internship_column} IS NOT NULL
+                ORDER BY distance
+                LIMIT :k
+            ) nearest
+        """),
+    ]
+
+def refresh_candidate(db: Session, candidate_id: int, embedding, k: int = RECOMMENDATIONS_TOP_K):
+    for statement, params in refresh_candidate_statements(candidate_id, embedding, k):
+        db.execute(statement, params)
+
+async def refresh_candidate_async(db: AsyncSession, candidate_id: int, embedding, k: int = RECOMMENDATIONS_TOP_K):
+    for statement, params in refresh_candidate_statements(candidate_id, embedding, k, binary=True):
+        await db.execute(statement, params)
+
+def add_internship(db: Session, internship_id: int, k: int = RECOMMENDATIONS_TOP_K) -> int:
+    """Score one new internship against every candidate and splice it into the top-k it beats.
+
+    A candidate's current k-th entry is found through the (candidate_id, rank)
+    index, so other candidates' lists are never re-read. Returns the number of
+    candidates whose recommendations changed.
+    """
+    params = {"internship_id": internship_id, "k": k}
+    inserted = db.execute(
+        _add_internship_query(versions.column("candidates"), versions.column("internships")), params
+    ).rowcount
+    if not inserted:
+        return 0
+
+    # Re-rank only the candidates that just gained this internship and drop whatever fell past k
+    db.execute(text("""
+        WITH ranked AS (
+            SELECT candidate_id, internship_id,
+                   row_number() OVER (PARTITION BY candidate_id ORDER BY similarity DESC, internship_id) AS new_rank
+            FROM candidate_recommendations
+            WHERE candidate_id IN (
+                SELECT candidate_id FROM candidate_recommendations WHERE internship_id = :internship_id
+            )
+        ), dropped AS (
+            DELETE FROM candidate_recommendations r
+            USING ranked
+            WHERE r.candidate_id = ranked.candidate_id AND r.internship_id = ranked.internship_id
+              AND ranked.new_rank > :k
+        )
+        UPDATE candidate_recommendations r
+        SET rank = ranked.new_rank
+        FROM ranked
+        WHERE r.candidate_id = ranked.candidate_id AND r.internship_id = ranked.internship_id
+          AND ranked.new_rank <= :k AND r.rank <> ranked.new_rank
+    """), params)
+    return inserted
+
+@functools.lru_cache(maxsize=None)
+def _add_internship_query(candidate_column: str, internship_column: str):
+    return text(f"""
+        INSERT INTO candidate_recommendations (candidate_id, internship_id, rank, similarity)
+        SELECT c.id, i.id, :k + 1, 1 - (c.{candidate_column} <=> i.{internship_column})
+        FROM internships i
+        CROSS JOIN candidates c
+        LEFT JOIN candidate_recommendations worst ON worst.candidate_id = c.id AND worst.rank = :k
+        WHERE i.id = :internship_id
+          AND i.{internship_column} IS NOT NULL
+          AND c.{candidate_column} IS NOT NULL
+          AND (worst.candidate_id IS NULL OR 1 - (c.{candidate_column} <=> i.{internship_column}) > worst.similarity)
+        ON CONFLICT (candidate_id, internship_id) DO NOTHING
+    """)
+
+RECOMMENDATIONS_QUERY = text("""
+    SELECT i.id, i.internship_title, i.company_name, i.location, i.stipend_min, i.stipend_max,
+           r.similarity
+    FROM candidate_recommendations r
+    JOIN internships i ON i.id = r.internship_id
+    WHERE r.candidate_id = :candidate_id
+    ORDER BY r.rank
+    LIMIT :limit
+""")
+
+async def get_recommendations_async(db: AsyncSession, candidate_id: int, limit: int = RECOMMENDATIONS_TOP_K):
+    results = (await db.execute(RECOMMENDATIONS_QUERY, {"candidate_id": candidate_id, "limit": limit})).fetchall()
+    return [row._asdict() for row in results]
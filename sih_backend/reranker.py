@@ -0,0 +1,116 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Tuple
+
+from offload import rerank_executor
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "0") == "1"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# First-stage rows rescored by the cross-encoder
+RERANK_DEPTH = int(os.getenv("RERANK_DEPTH", "30"))
+# Past this, the request is answered in first-stage order
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+# Pairs per cross-encoder pass; the budget is checked between passes, so an
+# abandoned request stops within one pass instead of holding the rerank pool
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def internship_text(row: dict) -> str:
+    return f"{row['internship_title']} at {row['company_name']}"
+
+class RerankExpired(Exception):
+    """The request stopped waiting before its rows were scored."""
+
+class CrossEncoderReranker:
+    """Rescores first-stage search results with a cross-encoder in one batched pass.
+
+    `rerank` returns the rows and a status: "reranked", or "timeout"/"error"
+    when the rows come back unchanged in first-stage order. Scoring stops at
+    the request's deadline, so timed-out work does not delay later requests.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, executor=rerank_executor):
+        self.model_name = model_name
+        self.executor = executor
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counts = {"reranked": 0, "timeout": 0, "error": 0}
+        # Scoring abandoned in the pool after its request had timed out
+        self._expired = 0
+        self._latencies = deque(maxlen=1000)
+
+    def load(self):
+        with self._load_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def _score(self, query: str, rows: List[dict], deadline: float) -> List[float]:
+        model = self.load()
+        pairs = [(query, internship_text(row)) for row in rows]
+        scores = []
+        for start in range(0, len(pairs), RERANK_BATCH_SIZE):
+            if time.perf_counter() > deadline:
+                with self._stats_lock:
+                    self._expired += 1
+                raise RerankExpired()
+            batch = pairs[start:start + RERANK_BATCH_SIZE]
+            scores.extend(model.predict(batch, batch_size=len(batch), convert_to_numpy=True).tolist())
+        return scores
+
+    def _apply(self, rows: List[dict], scores: List[float]) -> List[dict]:
+        scored = [{**row, "rerank_score": score} for row, score in zip(rows, scores)]
+        return sorted(scored, key=lambda row: row["rerank_score"], reverse=True)
+
+    def _record(self, status: str, started: float):
+        with self._stats_lock:
+            self._counts[status] += 1
+            self._latencies.append((time.perf_counter() - started) * 1000)
+
+    async def rerank_async(self, query: str, rows: List[dict], budget_ms: float = RERANK_BUDGET_MS) -> Tuple[List[dict], str]:
+        started = time.perf_counter()
+        try:
+            if self._model is None:
+                # Without warm-up the first request loads the model; that is not scoring time
+                await asyncio.wrap_future(self.executor.submit(self.load))
+                started = time.perf_counter()
+            future = self.executor.submit(self._score, query, rows, started + budget_ms / 1000)
+            scores = await asyncio.wait_for(asyncio.wrap_future(future), timeout=budget_ms / 1000)
+        except (asyncio.TimeoutError, RerankExpired):
+            future.cancel()
+            self._record("timeout", started)
+            return rows, "timeout"
+        except Exception as exc:
+            print(f"❌ Rerank failed: {exc}")
+            self._record("error", started)
+            return rows, "error"
+        self._record("reranked", started)
+        return self._apply(rows, scores), "reranked"
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            latencies = list(self._latencies)
+            return {
+                "enabled": RERANK_ENABLED,
+                "model": self.model_name,
+                "loaded": self._model is not None,
+                "depth": RERANK_DEPTH,
+                "budget_ms": RERANK_BUDGET_MS,
+                "batch_size": RERANK_BATCH_SIZE,
+                **self._counts,
+                "expired": self._expired,
+                "latency_ms_p50": _percentile(latencies, 0.5),
+                "latency_ms_p95": _percentile(latencies, 0.95),
+            }
+
+reranker = CrossEncoderReranker()
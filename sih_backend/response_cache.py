@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+# Optional cache shared by all workers (and data_loader.py), e.g. redis://localhost:6379/0
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL")
+# How long a worker trusts its last read of the shared version counters
+RESPONSE_CACHE_VERSION_CHECK_SECONDS = float(os.getenv("RESPONSE_CACHE_VERSION_CHECK_SECONDS", "1"))
+
+# Every cached response is built from the internships table
+INTERNSHIPS = "internships"
+
+def normalize_skills(skills) -> list:
+    """Case, whitespace, order and duplicates change neither the cache key nor the search."""
+    return sorted({" ".join(skill.lower().split()) for skill in skills if skill.strip()})
+
+class TTLCache:
+    """In-process LRU whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, max_items: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._items[key]
+                self.expirations += 1
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+class RedisBackend:
+    """Shared tier: cached values and the version counters live in Redis.
+
+    Values are stored as JSON, never pickled: anything that can write to the
+    shared store must not be able to run code in the API.
+    """
+
+    def __init__(self, url: str, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self._redis.get(f"response:{key}")
+        return json.loads(data) if data is not None else None
+
+    def put(self, key: str, value: Any):
+        self._redis.set(f"response:{key}", json.dumps(value), ex=max(1, int(self.ttl)))
+
+    def version(self, namespace: str) -> int:
+        return int(self._redis.get(f"version:{namespace}") or 0)
+
+    def bump(self, namespace: str) -> int:
+        return int(self._redis.incr(f"version:{namespace}"))
+
+class ResponseCache:
+    """Read-through cache for endpoint responses.
+
+    Keys embed the current version of their namespace, so a write path only
+    has to `bump` the version: older entries are never read again and age
+    out through TTL and LRU. Without a shared backend the versions are per
+    process, and writes made by other processes show up once entries expire.
+    """
+
+    def __init__(self, local: Optional[TTLCache] = None, shared=None):
+        self.local = local if local is not None else TTLCache()
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._versions_checked = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.shared_errors = 0
+
+    def version(self, namespace: str) -> int:
+        if self.shared is None:
+            return self._versions.get(namespace, 0)
+        now = time.monotonic()
+        if now - self._versions_checked.get(namespace, float("-inf")) > RESPONSE_CACHE_VERSION_CHECK_SECONDS:
+            try:
+                self._versions[namespace] = self.shared.version(namespace)
+                self._versions_checked[namespace] = now
+            except Exception:
+                self.shared_errors += 1
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace: str):
+        """Invalidate every cached response of `namespace`; call after the write commits."""
+        with self._lock:
+            self.invalidations += 1
+            version = self._versions.get(namespace, 0) + 1
+            if self.shared is not None:
+                try:
+                    version = self.shared.bump(namespace)
+                except Exception:
+                    self.shared_errors += 1
+            self._versions[namespace] = version
+            self._versions_checked[namespace] = time.monotonic()
+
+    def key(self, namespace: str, **params) -> str:
+        payload = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"{namespace}:{self.version(namespace)}:{digest}"
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception:
+                self.shared_errors += 1
+            if value is not None:
+                self.local.put(key, value)
+                self.shared_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any):
+        """`value` must be JSON-serializable, so both tiers return the same thing."""
+        self.local.put(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.put(key, value)
+            except Exception:
+                self.shared_errors += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "backend": "redis" if self.shared is not None else "memory",
+            "entries": len(self.local),
+            "max_entries": self.local.max_items,
+            "ttl_seconds": self.local.ttl,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "shared_errors": self.shared_errors,
+            "versions": dict(self._versions),
+        }
+
+response_cache = ResponseCache(shared=RedisBackend(RESPONSE_CACHE_REDIS_URL) if RESPONSE_CACHE_REDIS_URL else None)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import date
+from datetime import date, datetime
 
 class InternshipBase(BaseModel):
     internship_title: str
@@ -26,6 +26,27 @@ class Internship(InternshipBase):
 class CandidateSkills(BaseModel):
     skills: List[str]
 
+class SearchFilters(BaseModel):
+    location: Optional[str] = None
+    is_remote: Optional[bool] = None
+    min_stipend: Optional[int] = None
+    min_duration: Optional[int] = None
+    max_duration: Optional[int] = None
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in self.model_dump().values())
+
+class BatchMatchRequest(BaseModel):
+    candidate_ids: List[int] = []
+    skills: List[List[str]] = []
+    limit: int = 5
+
+class BatchApplicantsRequest(BaseModel):
+    # Postings to rank applicants for: explicit ids and/or every posting of a company
+    internship_ids: List[int] = []
+    company_name: Optional[str] = None
+    limit: int = 5
+
 class CandidateBase(BaseModel):
     name: str
     email: str
@@ -40,6 +61,23 @@ class Candidate(CandidateBase):
     skills: Optional[List[str]] = None
     resume_path: Optional[str] = None
     income_certificate_path: Optional[str] = None
+    skills_status: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class CandidateUpload(Candidate):
+    job_id: int
+
+class ExtractionJob(BaseModel):
+    id: int
+    candidate_id: int
+    status: str
+    stage: Optional[str] = None
+    attempts: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,390 @@
+import copy
+import json
+import os
+import threading
+from typing import List, Optional, Tuple
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from embedding_migration import versions
+from embeddings import MODEL_NAME
+
+# "pgvector" searches in Postgres; "numpy" keeps all internship vectors in this process
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "pgvector")
+NUMPY_INDEX_DIR = os.getenv("NUMPY_INDEX_DIR", "vector_index")
+# "float32" or "int8" (4x smaller, slightly lower precision)
+NUMPY_INDEX_DTYPE = os.getenv("NUMPY_INDEX_DTYPE", "float32")
+# 0 = exact search; > 0 = IVF with this many k-means lists
+NUMPY_INDEX_IVF_LISTS = int(os.getenv("NUMPY_INDEX_IVF_LISTS", "0"))
+NUMPY_INDEX_IVF_PROBES = int(os.getenv("NUMPY_INDEX_IVF_PROBES", "8"))
+# How often each worker pulls postings created or changed by other processes
+NUMPY_INDEX_REFRESH_SECONDS = float(os.getenv("NUMPY_INDEX_REFRESH_SECONDS", "30"))
+# Each refresh looks this far behind the previous one, so rows written by
+# transactions that committed after it began are not missed
+NUMPY_INDEX_REFRESH_OVERLAP_SECONDS = float(os.getenv("NUMPY_INDEX_REFRESH_OVERLAP_SECONDS", "60"))
+
+TEXT_FIELDS = ["internship_title", "company_name", "location"]
+# is_remote is stored as 1/0/NaN so NULLs never match a filter, as in SQL
+NUMERIC_FIELDS = ["stipend_min", "stipend_max", "duration_months", "is_remote"]
+INT8_SCALE = 127.0
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _numeric(value) -> float:
+    return np.nan if value is None else float(value)
+
+def internship_rows_query(where: str):
+    """Internships with a vector from this process's model, returned as `embedding`."""
+    column = versions.column("internships")
+    return text(f"""
+        SELECT id, {", ".join(TEXT_FIELDS)}, {", ".join(NUMERIC_FIELDS)}, {column} AS embedding
+        FROM internships WHERE {column} IS NOT NULL {where} ORDER BY id
+    """).columns(embedding=Vector())
+
+def _save_atomic(path: str, array: np.ndarray):
+    # Replace rather than overwrite: other workers may have the old file memory-mapped
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(path + ".tmp", path)
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(k):
+            members = vectors[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = normalize_vectors(centroids)
+    return centroids
+
+class _Snapshot:
+    """Everything a search reads. Writers publish a new snapshot instead of
+    changing this one, so a search never sees a half-applied update.
+    """
+
+    def __init__(self, ids: np.ndarray, matrix: np.ndarray, numeric: np.ndarray, texts: dict,
+                 centroids: Optional[np.ndarray] = None, assign: Optional[np.ndarray] = None):
+        self.ids = ids
+        self.matrix = matrix
+        self.numeric = numeric
+        self.texts = texts
+        self.centroids = centroids
+        self.assign = assign
+        self.location_vocab = {}
+        self.location_codes = np.array([
+            -1 if loc is None else self.location_vocab.setdefault(loc.lower(), len(self.location_vocab))
+            for loc in texts["location"]
+        ], dtype=np.int32)
+        # Base rows replaced by a newer version in the tail
+        self.base_dead = None
+        self.tail_ids = []
+        self.tail_matrix = None
+        self.tail_texts = {field: [] for field in TEXT_FIELDS}
+        # Base and tail filter columns, joined once here rather than on every search
+        self.all_numeric = numeric
+
+    @classmethod
+    def empty(cls) -> "_Snapshot":
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32),
+                   np.empty((0, len(NUMERIC_FIELDS)), dtype=np.float64), {field: [] for field in TEXT_FIELDS})
+
+    def with_tail_rows(self, rows: List[Tuple[int, np.ndarray, dict]]) -> "_Snapshot":
+        """A copy holding these versions of the postings in the tail, in place of any older ones."""
+        snapshot = copy.copy(self)
+        tail_ids = list(self.tail_ids)
+        tail_vectors = [] if self.tail_matrix is None else list(self.tail_matrix)
+        tail_texts = {field: list(self.tail_texts[field]) for field in TEXT_FIELDS}
+        tail_numeric = list(self.all_numeric[len(self.ids):])
+        positions = {internship_id: j for j, internship_id in enumerate(tail_ids)}
+        dead = []
+
+        for internship_id, vector, fields in rows:
+            numeric_row = np.array([_numeric(fields.get(f)) for f in NUMERIC_FIELDS])
+            j = positions.get(internship_id)
+            if j is None:
+                base = np.searchsorted(self.ids, internship_id)
+                if base < len(self.ids) and self.ids[base] == internship_id:
+                    dead.append(base)
+                positions[internship_id] = j = len(tail_ids)
+                tail_ids.append(internship_id)
+                tail_vectors.append(vector)
+                tail_numeric.append(numeric_row)
+                for field in TEXT_FIELDS:
+                    tail_texts[field].append(fields.get(field))
+            else:
+                tail_vectors[j] = vector
+                tail_numeric[j] = numeric_row
+                for field in TEXT_FIELDS:
+                    tail_texts[field][j] = fields.get(field)
+
+        if dead:
+            snapshot.base_dead = np.zeros(len(self.ids), dtype=bool) if self.base_dead is None else self.base_dead.copy()
+            snapshot.base_dead[dead] = True
+        snapshot.tail_ids = tail_ids
+        snapshot.tail_matrix = np.stack(tail_vectors) if tail_vectors else None
+        snapshot.tail_texts = tail_texts
+        snapshot.all_numeric = np.concatenate([self.numeric, np.array(tail_numeric).reshape(-1, len(NUMERIC_FIELDS))])
+        return snapshot
+
+class NumpyVectorIndex:
+    """Internship vectors in one contiguous matrix, searched with a single mat-vec product.
+
+    The base matrix is memory-mapped from `path`; postings added or changed
+    after the last build are kept in a small in-memory tail and searched
+    alongside it, hiding their base rows. Scores are cosine similarities, matching `1 - (embedding <=> q)` in SQL.
+    """
+
+    def __init__(self, path: str = NUMPY_INDEX_DIR, dtype: str = NUMPY_INDEX_DTYPE, ivf_lists: int = NUMPY_INDEX_IVF_LISTS,
+                 model: str = MODEL_NAME):
+        # One build per model, so workers on either side of a model migration never share vectors
+        self.path = os.path.join(path, model.replace("/", "--"))
+        self.dtype = dtype
+        self.ivf_lists = ivf_lists
+        # Serializes writers only; searches read whichever snapshot is current
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot.empty()
+        # Database time the index was last brought up to date; see refresh()
+        self._synced_at = None
+        # synced_at of the build on disk that the snapshot was loaded from
+        self._built_at = None
+
+    def __len__(self) -> int:
+        snapshot = self._snapshot
+        dead = 0 if snapshot.base_dead is None else int(snapshot.base_dead.sum())
+        return len(snapshot.ids) - dead + len(snapshot.tail_ids)
+
+    @property
+    def max_id(self) -> int:
+        snapshot = self._snapshot
+        ids = [int(snapshot.ids.max())] if len(snapshot.ids) else []
+        return max(ids + snapshot.tail_ids, default=0)
+
+    # ----------- Building and persistence -----------
+
+    def build(self, db: Session):
+        """Full rebuild from the internships table, written to disk and re-opened memory-mapped."""
+        synced_at = db.execute(text("SELECT now()")).scalar()
+        rows = db.execute(internship_rows_query("")).fetchall()
+
+        vectors = normalize_vectors(np.array([np.asarray(r.embedding, dtype=np.float32) for r in rows])) if rows else np.empty((0, 0), dtype=np.float32)
+        os.makedirs(self.path, exist_ok=True)
+        if self.dtype == "int8":
+            stored = np.round(vectors * INT8_SCALE).astype(np.int8)
+        else:
+            stored = vectors
+        _save_atomic(os.path.join(self.path, "embeddings.npy"), stored)
+        _save_atomic(os.path.join(self.path, "numeric.npy"), np.array(
+            [[_numeric(getattr(r, f)) for f in NUMERIC_FIELDS] for r in rows], dtype=np.float64
+        ).reshape(len(rows), len(NUMERIC_FIELDS)))
+        with open(os.path.join(self.path, "texts.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({field: [getattr(r, field) for r in rows] for field in TEXT_FIELDS}, f)
+        os.replace(os.path.join(self.path, "texts.json.tmp"), os.path.join(self.path, "texts.json"))
+
+        if self.ivf_lists and len(rows) > self.ivf_lists:
+            centroids = _kmeans(vectors, self.ivf_lists)
+            _save_atomic(os.path.join(self.path, "centroids.npy"), centroids)
+            _save_atomic(os.path.join(self.path, "assign.npy"), np.argmax(vectors @ centroids.T, axis=1).astype(np.int32))
+        else:
+            for name in ("centroids.npy", "assign.npy"):
+                if os.path.exists(os.path.join(self.path, name)):
+                    os.remove(os.path.join(self.path, name))
+        _save_atomic(os.path.join(self.path, "ids.npy"), np.array([r.id for r in rows], dtype=np.int64))
+        # meta.json marks a complete build, so it is written last
+        with open(os.path.join(self.path, "meta.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({"synced_at": synced_at.isoformat()}, f)
+        os.replace(os.path.join(self.path, "meta.json.tmp"), os.path.join(self.path, "meta.json"))
+
+        self.load()
+        print(f"✅ NumPy vector index built with {len(rows)} internships")
+
+    def load(self) -> bool:
+        # Builds without meta.json predate change tracking and are rebuilt
+        built_at = self._read_built_at()
+        if built_at is None:
+            return False
+        with open(os.path.join(self.path, "texts.json"), encoding="utf-8") as f:
+            texts = json.load(f)
+        centroids = assign = None
+        if os.path.exists(os.path.join(self.path, "centroids.npy")):
+            centroids = np.load(os.path.join(self.path, "centroids.npy"))
+            assign = np.load(os.path.join(self.path, "assign.npy"))
+        snapshot = _Snapshot(
+            ids=np.load(os.path.join(self.path, "ids.npy")),
+            matrix=np.load(os.path.join(self.path, "embeddings.npy"), mmap_mode="r"),
+            numeric=np.load(os.path.join(self.path, "numeric.npy")),
+            texts=texts,
+            centroids=centroids,
+            assign=assign,
+        )
+        with self._lock:
+            self._snapshot = snapshot
+            self._synced_at = self._built_at = built_at
+        return True
+
+    def _read_built_at(self) -> Optional[datetime]:
+        try:
+            with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+                return datetime.fromisoformat(json.load(f)["synced_at"])
+        except FileNotFoundError:
+            return None
+
+    def load_or_build(self, db: Session):
+        if not self.load():
+            self.build(db)
+        self.refresh(db)
+
+    def refresh(self, db: Session):
+        """Pull postings created or changed since the last build or refresh (e.g. by other workers).
+
+        A newer build on disk, e.g. from `manage.py build-index`, is loaded first.
+        """
+        if self._built_at != self._read_built_at():
+            self.load()
+        synced_at = db.execute(text("SELECT now()")).scalar()
+        since = self._synced_at - timedelta(seconds=NUMPY_INDEX_REFRESH_OVERLAP_SECONDS)
+        rows = db.execute(
+            internship_rows_query("AND (id > :max_id OR updated_at > :since)"), {"max_id": self.max_id, "since": since}
+        ).fetchall()
+        if rows:
+            self._add_rows([(r.id, r.embedding, {f: getattr(r, f) for f in TEXT_FIELDS + NUMERIC_FIELDS}) for r in rows])
+        self._synced_at = synced_at
+
+    def add(self, internship_id: int, embedding, fields: dict):
+        """Keep the index in sync with a posting just written to the database."""
+        self._add_rows([(internship_id, embedding, fields)])
+
+    def _add_rows(self, rows):
+        rows = [(int(internship_id), normalize_vectors(embedding), fields) for internship_id, embedding, fields in rows]
+        with self._lock:
+            self._snapshot = self._snapshot.with_tail_rows(rows)
+
+    # ----------- Search -----------
+
+    def _filter_mask(self, snapshot: _Snapshot, filters) -> Optional[np.ndarray]:
+        if filters is None or filters.is_empty():
+            return None
+        numeric = snapshot.all_numeric
+        mask = np.ones(len(numeric), dtype=bool)
+        stipend_max, duration, is_remote = numeric[:, 1], numeric[:, 2], numeric[:, 3]
+        if filters.location is not None:
+            wanted = filters.location.lower()
+            base = snapshot.location_codes == snapshot.location_vocab.get(wanted, -2)
+            tail = np.array([loc is not None and loc.lower() == wanted for loc in snapshot.tail_texts["location"]], dtype=bool)
+            mask &= np.concatenate([base, tail])
+        if filters.is_remote is not None:
+            mask &= is_remote == float(filters.is_remote)
+        if filters.min_stipend is not None:
+            mask &= stipend_max >= filters.min_stipend
+        if filters.min_duration is not None:
+            mask &= duration >= filters.min_duration
+        if filters.max_duration is not None:
+            mask &= duration <= filters.max_duration
+        return mask
+
+    def _base_scores(self, snapshot: _Snapshot, query: np.ndarray, probes: int) -> np.ndarray:
+        if snapshot.centroids is None:
+            rows = None
+        else:
+            nearest_lists = np.argsort(-(snapshot.centroids @ query))[:probes]
+            rows = np.flatnonzero(np.isin(snapshot.assign, nearest_lists))
+
+        matrix = snapshot.matrix if rows is None else snapshot.matrix[rows]
+        if self.dtype == "int8":
+            scores = (matrix @ query) / INT8_SCALE
+        else:
+            scores = matrix @ query
+
+        if rows is None:
+            return scores
+        full = np.full(len(snapshot.ids), -np.inf, dtype=np.float32)
+        full[rows] = scores
+        return full
+
+    def _row(self, snapshot: _Snapshot, i: int, score: float) -> dict:
+        base = len(snapshot.ids)
+        texts = snapshot.texts if i < base else snapshot.tail_texts
+        j = i if i < base else i - base
+        numeric = snapshot.all_numeric
+        return {
+            "id": int(snapshot.ids[i]) if i < base else snapshot.tail_ids[j],
+            "internship_title": texts["internship_title"][j],
+            "company_name": texts["company_name"][j],
+            "location": texts["location"][j],
+            "stipend_min": None if np.isnan(numeric[i, 0]) else int(numeric[i, 0]),
+            "stipend_max": None if np.isnan(numeric[i, 1]) else int(numeric[i, 1]),
+            "similarity": float(score),
+        }
+
+    def search(self, embedding, limit: int = 5, filters=None, probes: Optional[int] = None) -> List[dict]:
+        query = normalize_vectors(embedding)
+        snapshot = self._snapshot
+        parts = []
+        if len(snapshot.ids):
+            parts.append(self._base_scores(snapshot, query, probes or NUMPY_INDEX_IVF_PROBES))
+        if snapshot.tail_matrix is not None:
+            parts.append(snapshot.tail_matrix @ query)
+        if not parts:
+            return []
+        scores = np.concatenate(parts).astype(np.float32, copy=False)
+        if snapshot.base_dead is not None:
+            scores[:len(snapshot.ids)][snapshot.base_dead] = -np.inf
+
+        mask = self._filter_mask(snapshot, filters)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top = top[np.isfinite(scores[top])]
+        return [self._row(snapshot, int(i), scores[i]) for i in top]
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "backend": "numpy",
+            "rows": len(self),
+            "tail_rows": len(snapshot.tail_ids),
+            "dtype": self.dtype,
+            "ivf_lists": 0 if snapshot.centroids is None else len(snapshot.centroids),
+        }
+
+numpy_index = NumpyVectorIndex() if SEARCH_BACKEND == "numpy" else None
+
+_stop_refresh = threading.Event()
+
+def start(session_factory):
+    """Open the NumPy index and keep pulling new postings in the background."""
+    if numpy_index is None:
+        return
+    db = session_factory()
+    try:
+        numpy_index.load_or_build(db)
+    finally:
+        db.close()
+
+    def refresh_loop():
+        while not _stop_refresh.wait(NUMPY_INDEX_REFRESH_SECONDS):
+            db = session_factory()
+            try:
+                numpy_index.refresh(db)
+            except Exception as exc:
+                print(f"❌ NumPy index refresh failed: {exc}")
+            finally:
+                db.close()
+
+    _stop_refresh.clear()
+    threading.Thread(target=refresh_loop, name="numpy-index-refresh", daemon=True).start()
+
+def stop():
+    _stop_refresh.set()
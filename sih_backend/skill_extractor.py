@@ -0,0 +1,274 @@
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Bump when extraction logic changes so cached results are not reused
+EXTRACTOR_VERSION = "3"
+SKILL_DICT_MIN_SKILLS = int(os.getenv("SKILL_DICT_MIN_SKILLS", "5"))
+# Share of the words in the resume's skills section that must be known skills
+# for the dictionary result to be trusted without the LLM
+SKILL_DICT_MIN_COVERAGE = float(os.getenv("SKILL_DICT_MIN_COVERAGE", "0.8"))
+SKILL_VOCAB_TTL_SECONDS = int(os.getenv("SKILL_VOCAB_TTL_SECONDS", "3600"))
+# Comma-separated tier names, cheapest first
+SKILL_EXTRACTOR_TIERS = os.getenv("SKILL_EXTRACTOR_TIERS", "dictionary,llm")
+MAX_NGRAM = 4
+
+# Seed vocabulary for the dictionary tier; skills stored on internships are
+# added on top of it.
+SEED_SKILLS = [
+    "Python", "Java", "C++", "C#", "JavaScript", "TypeScript", "Golang", "Rust", "Kotlin", "Swift",
+    "PHP", "Ruby", "MATLAB", "Scala", "Dart", "SQL", "MySQL", "PostgreSQL", "MongoDB", "Redis",
+    "HTML", "CSS", "React", "React Native", "Angular", "Vue.js", "Node.js", "Express.js", "Next.js",
+    "Django", "Flask", "FastAPI", "Spring Boot", "Flutter", "Android", "iOS", "Git", "GitHub", "Docker",
+    "Kubernetes", "AWS", "Azure", "Google Cloud", "Linux", "REST API", "GraphQL", "DSA",
+    "Data Structures", "Algorithms", "Machine Learning", "Deep Learning", "NLP", "Computer Vision",
+    "TensorFlow", "PyTorch", "Scikit-learn", "Pandas", "NumPy", "Data Analysis", "Data Science",
+    "Power BI", "Tableau", "Excel", "MS Excel", "Statistics", "Figma", "Photoshop", "Illustrator",
+    "UI/UX Design", "Canva", "Video Editing", "Content Writing", "Copywriting", "SEO",
+    "Digital Marketing", "Social Media Marketing", "Email Marketing", "Sales", "Business Development",
+    "Accounting", "Finance", "Tally", "Communication", "Public Speaking", "Leadership",
+    "Project Management", "Market Research", "Customer Service", "Human Resources", "Recruitment",
+    "AutoCAD", "SolidWorks", "Embedded Systems", "Arduino", "IoT", "Blockchain", "Cyber Security",
+]
+
+# Headings that open the skills section of a resume, and headings that end it
+_SKILL_HEADINGS = {
+    "skills", "technical skills", "key skills", "core skills", "skill set", "skillset", "skills summary",
+    "tech stack", "technologies", "technical proficiency", "core competencies", "competencies",
+}
+_OTHER_HEADINGS = {
+    "education", "experience", "work experience", "professional experience", "projects", "academic projects",
+    "certifications", "certificates", "achievements", "awards", "internships", "publications", "hobbies",
+    "interests", "summary", "objective", "career objective", "profile", "extracurricular activities",
+    "positions of responsibility", "languages known", "declaration", "references", "contact",
+}
+# Words of a skills section that are not skills themselves ("Languages: ...", "proficient in")
+_SECTION_FILLER = {
+    "and", "or", "with", "in", "of", "the", "&", "etc", "skills", "skill", "technical", "soft", "other",
+    "languages", "language", "programming", "tools", "tool", "frameworks", "framework", "libraries",
+    "technologies", "databases", "database", "platforms", "cloud", "web", "proficient", "familiar",
+    "basic", "basics", "intermediate", "advanced", "beginner", "expert", "knowledge", "good", "strong",
+    "working", "experience", "hands-on",
+}
+_SECTION_MAX_LINES = 30
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9+#]")
+
+def tokenize(value: str) -> Tuple[str, ...]:
+    return tuple(_TOKEN_RE.findall(value.lower()))
+
+def _heading(line: str) -> Tuple[str, str]:
+    """The line's heading in lower case (or "") and whatever follows it on the line."""
+    head, sep, rest = line.partition(":")
+    head = " ".join(head.lower().split())
+    if head in _SKILL_HEADINGS or head in _OTHER_HEADINGS:
+        return head, rest
+    return "", line
+
+def skills_section(resume_text: str) -> Optional[str]:
+    """Text of the resume's skills section, or None when it has none."""
+    section = None
+    for line in resume_text.splitlines():
+        heading, rest = _heading(line)
+        if section is None:
+            if heading in _SKILL_HEADINGS:
+                section = [rest]
+        elif heading in _OTHER_HEADINGS or len(section) >= _SECTION_MAX_LINES:
+            break
+        else:
+            section.append(rest)
+    return None if section is None else "\n".join(section)
+
+class SkillExtraction(BaseModel):
+    skills: List[str]
+    tier: str
+    confidence: float
+
+class SkillExtractor(ABC):
+    """One tier of the extraction pipeline."""
+
+    name = "base"
+
+    @abstractmethod
+    def extract(self, resume_text: str) -> SkillExtraction:
+        """Skills found in `resume_text`, with the tier's confidence in them."""
+
+class DictionarySkillExtractor(SkillExtractor):
+    """Greedy longest-match lookup of known skill phrases over resume tokens.
+
+    Confidence is the share of the skills section's words covered by known
+    phrases, relative to `min_coverage`, and is capped by the number of skills
+    found relative to `min_skills`. A resume without a recognisable skills
+    section scores 0, so it always reaches the next tier.
+    """
+
+    name = "dictionary"
+
+    def __init__(self, vocabulary: Iterable[str] = SEED_SKILLS, min_skills: int = SKILL_DICT_MIN_SKILLS,
+                 min_coverage: float = SKILL_DICT_MIN_COVERAGE):
+        self.min_skills = min_skills
+        self.min_coverage = min_coverage
+        self.set_vocabulary(vocabulary)
+
+    def set_vocabulary(self, vocabulary: Iterable[str]):
+        phrases: Dict[Tuple[str, ...], str] = {}
+        for skill in vocabulary:
+            tokens = tokenize(skill)
+            if 0 < len(tokens) <= MAX_NGRAM:
+                phrases.setdefault(tokens, skill.strip())
+        self._phrases = phrases
+
+    def _match(self, tokens: Tuple[str, ...], found: Dict[str, str]) -> int:
+        """Add the skills found in `tokens` to `found`; returns how many tokens they covered."""
+        phrases = self._phrases
+        covered = 0
+        i = 0
+        while i < len(tokens):
+            for n in range(min(MAX_NGRAM, len(tokens) - i), 0, -1):
+                skill = phrases.get(tokens[i:i + n])
+                if skill is not None:
+                    found.setdefault(skill.lower(), skill)
+                    covered += n
+                    i += n
+                    break
+            else:
+                i += 1
+        return covered
+
+    def coverage(self, resume_text: str) -> float:
+        """Share of the skills section's words, filler aside, that belong to known skills."""
+        section = skills_section(resume_text)
+        if section is None:
+            return 0.0
+        tokens = tuple(token for token in tokenize(section) if token not in _SECTION_FILLER)
+        if not tokens:
+            return 0.0
+        return self._match(tokens, {}) / len(tokens)
+
+    def extract(self, resume_text: str) -> SkillExtraction:
+        found = {}
+        self._match(tokenize(resume_text), found)
+        skills = list(found.values())
+
+        confidence = min(1.0, self.coverage(resume_text) / self.min_coverage) if self.min_coverage else 1.0
+        if self.min_skills:
+            confidence = min(confidence, len(skills) / self.min_skills)
+        return SkillExtraction(skills=skills, tier=self.name, confidence=confidence)
+
+class LLMSkillExtractor(SkillExtractor):
+    name = "llm"
+
+    def __init__(self, extract_fn: Callable[[str], List[str]]):
+        self.extract_fn = extract_fn
+
+    def extract(self, resume_text: str) -> SkillExtraction:
+        return SkillExtraction(skills=self.extract_fn(resume_text), tier=self.name, confidence=1.0)
+
+class TieredSkillExtractor:
+    """Runs tiers cheapest first and stops at the first confident result.
+
+    If a later tier raises, the best earlier result is returned instead, so an
+    LLM outage degrades to dictionary matches rather than a failed job.
+    """
+
+    def __init__(self, tiers: List[SkillExtractor], min_confidence: float = 1.0):
+        self.tiers = tiers
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._attempts = {tier.name: 0 for tier in tiers}
+        self._hits = {tier.name: 0 for tier in tiers}
+        self._latency_ms = {tier.name: 0.0 for tier in tiers}
+
+    def extract(self, resume_text: str) -> SkillExtraction:
+        best: Optional[SkillExtraction] = None
+        for i, tier in enumerate(self.tiers):
+            started = time.perf_counter()
+            try:
+                result = tier.extract(resume_text)
+            except Exception:
+                if best is None or not best.skills:
+                    raise
+                print(f"❌ Skill extractor tier '{tier.name}' failed, keeping '{best.tier}' result")
+                self._record(best.tier, hit=True)
+                return best
+            finally:
+                self._record(tier.name, elapsed=time.perf_counter() - started)
+
+            if best is None or result.confidence > best.confidence:
+                best = result
+            if result.confidence >= self.min_confidence or i == len(self.tiers) - 1:
+                self._record(tier.name, hit=True)
+                return result
+        return best
+
+    def _record(self, tier: str, elapsed: Optional[float] = None, hit: bool = False):
+        with self._lock:
+            if elapsed is not None:
+                self._attempts[tier] += 1
+                self._latency_ms[tier] += elapsed * 1000
+            if hit:
+                self._hits[tier] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "attempts": self._attempts[name],
+                    "hits": self._hits[name],
+                    "hit_rate": self._hits[name] / self._attempts[name] if self._attempts[name] else 0.0,
+                    "avg_latency_ms": self._latency_ms[name] / self._attempts[name] if self._attempts[name] else 0.0,
+                }
+                for name in self._attempts
+            }
+
+def load_vocabulary(db: Session) -> List[str]:
+    """Seed skills plus the skills stored on internships.
+
+    Titles are left out: words like "Marketing" or "Operations" name a role,
+    and matching them anywhere in a resume would report skills it does not list.
+    """
+    rows = db.execute(text("SELECT DISTINCT unnest(skills) FROM internships WHERE skills IS NOT NULL")).scalars().all()
+    return list(SEED_SKILLS) + [value for value in rows if value and value.strip()]
+
+class SkillExtractorRegistry:
+    """Holds the process-wide tiered extractor and refreshes its vocabulary."""
+
+    def __init__(self, tier_names: str = SKILL_EXTRACTOR_TIERS):
+        self.tier_names = [name.strip() for name in tier_names.split(",") if name.strip()]
+        self._lock = threading.Lock()
+        self._extractor: Optional[TieredSkillExtractor] = None
+        self._dictionary: Optional[DictionarySkillExtractor] = None
+        self._loaded_at: Optional[float] = None
+
+    def _build(self, llm_extract_fn: Callable[[str], List[str]]) -> TieredSkillExtractor:
+        tiers = []
+        for name in self.tier_names:
+            if name == DictionarySkillExtractor.name:
+                self._dictionary = DictionarySkillExtractor()
+                tiers.append(self._dictionary)
+            elif name == LLMSkillExtractor.name:
+                tiers.append(LLMSkillExtractor(llm_extract_fn))
+            else:
+                raise ValueError(f"Unknown skill extractor tier: {name}")
+        return TieredSkillExtractor(tiers)
+
+    def get(self, db: Session, llm_extract_fn: Callable[[str], List[str]]) -> TieredSkillExtractor:
+        with self._lock:
+            if self._extractor is None:
+                self._extractor = self._build(llm_extract_fn)
+            stale = self._loaded_at is None or time.monotonic() - self._loaded_at > SKILL_VOCAB_TTL_SECONDS
+            if self._dictionary is not None and stale:
+                self._dictionary.set_vocabulary(load_vocabulary(db))
+                self._loaded_at = time.monotonic()
+            return self._extractor
+
+    def stats(self) -> dict:
+        return self._extractor.stats() if self._extractor is not None else {}
+
+registry = SkillExtractorRegistry()
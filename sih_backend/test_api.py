@@ -49,7 +49,26 @@ def test_search_internships():
         print(f"POST /search/ - Failure: {response.status_code}")
         print(response.text)
 
+def test_batch_match():
+    print("\n--- Testing POST /match/batch ---")
+    url = f"{BASE_URL}/match/batch"
+    payload = {
+        "candidate_ids": [1],
+        "skills": [["java", "dsa", "python"], ["react", "javascript"]],
+        "limit": 3
+    }
+    response = requests.post(url, json=payload, stream=True)
+    if response.status_code == 200:
+        print("POST /match/batch - Success")
+        for line in response.iter_lines():
+            if line:
+                print(json.loads(line))
+    else:
+        print(f"POST /match/batch - Failure: {response.status_code}")
+        print(response.text)
+
 if __name__ == "__main__":
     # test_get_internships()
     # test_create_candidate()
     test_search_internships()
+    # test_batch_match()
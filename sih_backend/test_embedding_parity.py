@@ -0,0 +1,41 @@
+import numpy as np
+
+from embeddings import EMBEDDING_DIM, ONNX_MODEL_FILES, load_model
+
+# Minimum cosine similarity between a runtime's vector and the PyTorch vector for the same text
+MIN_COSINE = {
+    "onnx": 0.999,
+    "onnx-int8": 0.98,
+}
+
+TEXTS = [
+    "Data Science Intern Analytics Labs",
+    "Frontend Developer Intern Acme",
+    "python sql power bi machine learning",
+    "java dsa spring boot",
+    "react javascript html css",
+    "Marketing Intern Growth Co",
+    "dsa",
+    "",
+]
+
+def test_runtime_parity():
+    reference = load_model("torch").encode(TEXTS, convert_to_numpy=True)
+    for runtime, min_cosine in MIN_COSINE.items():
+        print(f"--- Testing {runtime} ({ONNX_MODEL_FILES[runtime]}) against torch ---")
+        vectors = load_model(runtime).encode(TEXTS)
+        assert vectors.shape == (len(TEXTS), EMBEDDING_DIM), vectors.shape
+        assert vectors.dtype == np.float32
+
+        cosines = np.sum(vectors * reference, axis=1) / (
+            np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)
+        )
+        print(f"min cosine {cosines.min():.5f}, mean cosine {cosines.mean():.5f}")
+        assert cosines.min() >= min_cosine, f"{runtime} drifted from torch: {cosines.min():.5f} < {min_cosine}"
+
+        # Nearest neighbours must be unchanged, not just close
+        assert (np.argsort(-(vectors @ vectors.T), axis=1)[:, :3] == np.argsort(-(reference @ reference.T), axis=1)[:, :3]).all()
+        print(f"{runtime} - Success")
+
+if __name__ == "__main__":
+    test_runtime_parity()
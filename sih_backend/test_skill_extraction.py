@@ -0,0 +1,61 @@
+from pdf_text import BACKENDS, PdfTextExtractor
+from skill_extractor import DictionarySkillExtractor
+
+RESUME_LINES = [
+    "Asha Verma",
+    "Career Objective",
+    "Aspiring data analyst looking for an internship.",
+    "Technical Skills",
+    "Languages: Python, SQL, Java",
+    "Tools: Git, Docker, Excel, Power BI",
+    "Libraries: Pandas, NumPy, Scikit-learn",
+    "Education",
+    "B.Tech Computer Science, 2026",
+]
+
+def resume_pdf(lines) -> bytes:
+    """A one-page PDF with each line of `lines` on its own text line."""
+    body = "\n".join(f"({line}) Tj T*" for line in lines)
+    stream = f"BT /F1 11 Tf 14 TL 72 760 Td\n{body}\nET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+def test_dictionary_tier_on_pdf_text():
+    pdf = resume_pdf(RESUME_LINES)
+    extractor = DictionarySkillExtractor()
+    expected = extractor.extract("\n".join(RESUME_LINES))
+    assert expected.confidence == 1.0, expected
+
+    for backend in BACKENDS:
+        print(f"--- Testing dictionary tier on {backend} output ---")
+        pdf_extractor = PdfTextExtractor()
+        # Pin the backend under test by marking the others unavailable
+        pdf_extractor._unavailable.update(name for name in BACKENDS if name != backend)
+        resume_text = pdf_extractor.extract(pdf)
+        if not resume_text:
+            print(f"{backend} not installed - Skipped")
+            continue
+
+        result = extractor.extract(resume_text)
+        print(f"confidence {result.confidence:.2f}, skills {result.skills}")
+        assert result.confidence == expected.confidence, result
+        assert sorted(result.skills) == sorted(expected.skills), result
+        print(f"{backend} - Success")
+
+if __name__ == "__main__":
+    test_dictionary_tier_on_pdf_text()
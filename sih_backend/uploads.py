@@ -0,0 +1,64 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from pydantic import BaseModel
+
+from offload import run_in, upload_executor
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+UPLOAD_MAX_BYTES = int(float(os.getenv("UPLOAD_MAX_MB", "10")) * 1024 * 1024)
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Resume + income certificate + form fields; checked against Content-Length before the body is read
+UPLOAD_MAX_REQUEST_BYTES = 2 * UPLOAD_MAX_BYTES + 1024 * 1024
+
+class StoredUpload(BaseModel):
+    path: str
+    sha256: str
+    size: int
+
+def content_path(sha256: str, filename: Optional[str]) -> str:
+    """uploads/ab/abcdef....pdf -- identical files share one path, different files never collide."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not ext[1:].isalnum():
+        ext = ""
+    return os.path.join(UPLOAD_DIR, sha256[:2], sha256 + ext)
+
+async def store_upload(upload: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> StoredUpload:
+    """Stream `upload` to its content-addressed path, hashing as it goes.
+
+    Aborts with 413 as soon as `max_bytes` is exceeded.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"{upload.filename} is larger than {max_bytes / (1024 * 1024):g} MB")
+                digest.update(chunk)
+                await run_in(upload_executor, f.write, chunk)
+
+        sha256 = digest.hexdigest()
+        path = content_path(sha256, upload.filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return StoredUpload(
+        path=path,
+        sha256=sha256,
+        size=size
+    )
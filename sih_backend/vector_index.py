@@ -0,0 +1,93 @@
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+# "hnsw", "ivfflat" or "none"
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+# 0 sizes the lists from the row count (rows / 1000, as pgvector recommends)
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "0"))
+# Lets filtered ANN scans keep walking the index until LIMIT rows pass the filters
+# (pgvector >= 0.8); "off" disables it for older servers
+VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "strict_order")
+
+# (table, column) pairs that get an ANN index
+INDEXED_VECTORS = [
+    ("internships", "embedding"),
+    ("candidates", "embedding"),
+]
+
+def index_name(table: str, column: str) -> str:
+    return f"ix_{table}_{column}_ann"
+
+def index_definition(conn, table: str, column: str, index_type: str, lists: Optional[int]) -> str:
+    if index_type == "hnsw":
+        return f"USING hnsw ({column} vector_cosine_ops) WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+    if index_type == "ivfflat":
+        if not lists:
+            rows = conn.execute(text(f"SELECT count(*) FROM {table} WHERE {column} IS NOT NULL")).scalar()
+            lists = IVFFLAT_LISTS or max(1, rows // 1000)
+        return f"USING ivfflat ({column} vector_cosine_ops) WITH (lists = {lists})"
+    raise ValueError(f"Unknown vector index type: {index_type}")
+
+def _existing_indexdef(conn, name: str) -> Optional[str]:
+    return conn.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"),
+        {"name": name}
+    ).scalar()
+
+def ensure_indexes(conn, index_type: str = VECTOR_INDEX_TYPE):
+    """Create missing ANN indexes. Existing indexes of another type are left for `rebuild`."""
+    if index_type == "none":
+        return
+    for table, column in INDEXED_VECTORS:
+        name = index_name(table, column)
+        existing = _existing_indexdef(conn, name)
+        if existing is None:
+            definition = index_definition(conn, table, column, index_type, None)
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}"))
+            print(f"✅ {index_type} index created on {table}.{column}")
+        elif f"USING {index_type}" not in existing:
+            print(f"⚠️ {name} is not {index_type}; run `python manage.py reindex` to rebuild it")
+
+def rebuild(engine, index_type: str = VECTOR_INDEX_TYPE, lists: Optional[int] = None):
+    """Build fresh ANN indexes next to the old ones and swap them in without blocking reads or writes."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table, column in INDEXED_VECTORS:
+            name = index_name(table, column)
+            if index_type == "none":
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                continue
+
+            definition = index_definition(conn, table, column, index_type, lists)
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}_new"))
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY {name}_new ON {table} {definition}"))
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            conn.execute(text(f"ALTER INDEX {name}_new RENAME TO {name}"))
+            print(f"✅ {index_type} index rebuilt on {table}.{column}")
+
+def search_settings(ef_search: Optional[int] = None, probes: Optional[int] = None, filtered: bool = False) -> List[Tuple[object, dict]]:
+    """Per-request recall knobs as transaction-local settings to run before the search query."""
+    settings = []
+    if filtered and VECTOR_ITERATIVE_SCAN != "off":
+        settings.append((text("SELECT set_config('hnsw.iterative_scan', :value, true)"), {"value": VECTOR_ITERATIVE_SCAN}))
+        # IVFFlat only supports relaxed ordering; the search query re-sorts its results
+        settings.append((text("SELECT set_config('ivfflat.iterative_scan', 'relaxed_order', true)"), {}))
+    if ef_search is not None:
+        settings.append((text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(ef_search)}))
+    if probes is not None:
+        settings.append((text("SELECT set_config('ivfflat.probes', :value, true)"), {"value": str(probes)}))
+    return settings
+
+def vector_param(embedding, binary: bool = False):
+    """A query vector for a `CAST(:param AS vector)` placeholder.
+
+    Async (asyncpg) sessions bind it in pgvector's binary format, see
+    database.py; psycopg2 sessions send the text form.
+    """
+    if binary:
+        return np.asarray(embedding, dtype=np.float32)
+    return "[" + ",".join(str(float(x)) for x in embedding) + "]"
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import crud
+import reranker
+
+# Load models in the background at startup; readiness waits for it.
+# With 0, models load on first use and readiness only checks the database.
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "1") == "1"
+
+def _load_embedding_model():
+    # A real batch through the model also pays one-off costs such as kernel selection
+    crud.embedding_model.load().encode(["warm up"], convert_to_numpy=True)
+
+def _load_reranker():
+    if reranker.RERANK_ENABLED:
+        reranker.reranker.load()
+
+# (name, loader, required for readiness); search cannot work without the embedding
+# model, while a missing LLM key only affects background skill extraction
+COMPONENTS = [
+    ("embedding_model", _load_embedding_model, True),
+    ("llm", crud.get_llm, False),
+    ("reranker", _load_reranker, False),
+]
+
+class WarmUp:
+    """Loads everything the first requests would otherwise pay for, once."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.seconds: Optional[float] = None
+        self.errors: Dict[str, str] = {}
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def ready(self) -> bool:
+        required = {name for name, _, is_required in COMPONENTS if is_required}
+        return self.done and not required & set(self.errors)
+
+    def run(self):
+        started = time.perf_counter()
+        for name, load, _ in COMPONENTS:
+            try:
+                load()
+            except Exception as exc:
+                self.errors[name] = f"{type(exc).__name__}: {exc}"
+                print(f"❌ Warm-up of {name} failed: {self.errors[name]}")
+        self.seconds = time.perf_counter() - started
+        self._done.set()
+        print(f"✅ Warm-up finished in {self.seconds:.1f}s")
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="warm-up", daemon=True)
+                self._thread.start()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": WARM_UP_ON_STARTUP,
+            "done": self.done,
+            "ready": self.ready,
+            "seconds": self.seconds,
+            "errors": dict(self.errors),
+            "embedding_model_loaded": crud.embedding_model.loaded,
+        }
+
+warm_up = WarmUp()